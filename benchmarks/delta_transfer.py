@@ -0,0 +1,65 @@
+import argparse
+import json
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import delta
+import delta_agent
+
+
+def synthetic_list(size, rng):
+  return [
+    {"words": [f"слово{idx}", f"word{idx}"], "score": rng.randint(0, 30)}
+    for idx in range(size)
+  ]
+
+
+def train(records, answers, rng):
+  # A card training changes the scores of a handful of words.
+  for idx in rng.sample(range(len(records)), answers):
+    records[idx]["score"] += rng.choice([1, 1, 1, -1])
+
+
+def run(size, answers, seed):
+  rng = random.Random(seed)
+  records = synthetic_list(size, rng)
+  before = json.dumps(records).encode("utf-8")
+  train(records, answers, rng)
+  after = json.dumps(records).encode("utf-8")
+
+  block_size = delta.block_size_for(len(before))
+  started = time.perf_counter()
+  signature = delta_agent.signature(before, block_size)
+  signature_time = time.perf_counter() - started
+  started = time.perf_counter()
+  patch = delta.compute_delta(signature, after, block_size)
+  delta_time = time.perf_counter() - started
+  assert delta.apply_delta(before, patch) == after
+
+  transferred = len(signature) + len(patch)
+  return {
+    "words": size,
+    "changed_scores": answers,
+    "file_bytes": len(after),
+    "block_size": block_size,
+    "signature_bytes": len(signature),
+    "delta_bytes": len(patch),
+    "transferred_bytes": transferred,
+    "saved_percent": round(100 * (1 - transferred / len(after)), 2),
+    "signature_seconds": round(signature_time, 4),
+    "delta_seconds": round(delta_time, 4),
+  }
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Bytes saved by delta uploads after a training")
+  parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+  parser.add_argument("--answers", type=int, default=50)
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args()
+  for size in args.sizes:
+    print(json.dumps(run(size, args.answers, args.seed), ensure_ascii=False))
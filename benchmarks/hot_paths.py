@@ -0,0 +1,160 @@
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+# main reads settings.json and network.json from the working directory on import.
+LAUNCH_DIR = pathlib.Path.cwd()
+WORK_DIR = tempfile.mkdtemp(prefix="flash_cards_bench_")
+os.chdir(WORK_DIR)
+
+from PySide6.QtWidgets import QApplication
+
+import main
+from word_collection import UNTAGGED
+
+
+def synthetic_list(size, rng):
+  # Half of the pairs are stored foreign word first, so auto_correction has swaps to do.
+  records = []
+  for idx in range(size):
+    words = [f"слово{idx}", f"word{idx}"]
+    if idx % 2:
+      words.reverse()
+    records.append({"words": words, "score": rng.choice([0, 0, 5, 25, 40])})
+  return records
+
+
+def measure(function, repeat, operations=1):
+  timings = []
+  for _ in range(repeat):
+    started = time.perf_counter()
+    function()
+    timings.append((time.perf_counter() - started) / operations)
+  return round(statistics.median(timings), 7)
+
+
+def click_matching_pairs(clicks):
+  for _ in range(clicks // 2):
+    if not main.CONTEXT.active_words:
+      main.start_train()
+    word = main.CONTEXT.active_words[0]
+    main.on_button_click("left", word.left_offset)()
+    main.on_button_click("right", word.right_offset)()
+
+
+def run(size, repeat, seed, window):
+  rng = random.Random(seed)
+  random.seed(seed)
+  list_path = pathlib.Path.cwd() / f"bench_{size}.json"
+  list_path.write_text(json.dumps(synthetic_list(size, rng)), encoding="utf-8")
+  list_path.with_name(list_path.name + ".journal").unlink(missing_ok=True)
+  main.CONTEXT.active_list_path = list_path
+  # Finishing a training opens a modal dialog; keep the session open for the whole run.
+  main.SETTINGS.cards.train_length = 10 ** 9
+  result = {"words": size}
+
+  result["load_list_seconds"] = measure(main.CONTEXT.load_list, repeat)
+
+  def stream_first_batch():
+    next(iter(main.CONTEXT.storage.stream(main.LOAD_BATCH_SIZE)))
+  result["stream_first_batch_seconds"] = measure(stream_first_batch, repeat)
+  def stream_whole_list():
+    for records in main.CONTEXT.storage.stream(main.LOAD_BATCH_SIZE):
+      main.prepare_loaded_batch(records)
+  result["stream_list_seconds"] = measure(stream_whole_list, repeat)
+
+  def full_auto_correction():
+    main.CONTEXT.collection.tags[:] = bytearray([UNTAGGED]) * len(main.CONTEXT.collection)
+    main.CONTEXT.auto_correction()
+  result["auto_correction_full_seconds"] = measure(full_auto_correction, repeat)
+
+  added = iter(range(10 ** 9))
+  def add_and_dump():
+    idx = next(added)
+    main.CONTEXT.add_record([f"новое{idx}", f"new{idx}"])
+    main.CONTEXT.dump_list()
+  result["dump_list_after_add_seconds"] = measure(add_and_dump, repeat)
+  result["dump_list_compact_seconds"] = measure(lambda: main.CONTEXT.dump_list(compact=True), repeat)
+
+  main.CONTEXT.scheduler
+  selections = 1000
+  def select_words():
+    for _ in range(selections):
+      main.select_word()
+  result["select_word_seconds"] = measure(select_words, repeat, selections)
+  result["fill_cards_seconds"] = measure(main.start_train, repeat)
+
+  clicks = 200
+  main.start_train()
+  result["on_button_click_seconds"] = measure(lambda: click_matching_pairs(clicks), repeat, clicks)
+  main.reset_stats()
+  main.CONTEXT.flush_score_deltas()
+
+  result["search_index_refresh_seconds"] = measure(main.get_search_index().refresh, 1)
+  searches = 100
+  def search_words():
+    for idx in range(searches):
+      main.get_search_index().search(f"wrd{idx * 7919 % size}")
+  result["search_seconds"] = measure(search_words, repeat, searches)
+
+  dialog = main.AddWordDialog(window)
+  # The dialog refreshes the search index in the background; keep it out of the timings below.
+  main.search_index_refresh.result()
+  dialog.ui.word1.setText(f"слово{size // 2}x")
+  dialog.ui.word2.setText("unknown")
+  checks = 100
+  def check_words():
+    for _ in range(checks):
+      dialog.update_accept_button_state()
+  result["update_accept_button_state_seconds"] = measure(check_words, repeat, checks)
+  dialog.deleteLater()
+
+  def open_change_list():
+    main.ChangeListDialog(window).deleteLater()
+  result["change_list_dialog_seconds"] = measure(open_change_list, repeat)
+
+  def open_spelling():
+    main.SpellingTrainDialog(window).deleteLater()
+  result["spelling_setup_seconds"] = measure(open_spelling, repeat)
+  QApplication.processEvents()
+  return result
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Timings of the flash card hot paths on synthetic lists")
+  parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+  parser.add_argument("--repeat", type=int, default=3)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--output", type=pathlib.Path, help="Also write the whole run to this JSON file")
+  args = parser.parse_args()
+
+  app = QApplication.instance() or QApplication(sys.argv[:1])
+  window = main.App()
+  results = []
+  for size in args.sizes:
+    results.append(run(size, args.repeat, args.seed, window))
+    print(json.dumps(results[-1]), flush=True)
+  if args.output is not None:
+    report = {
+      "date": datetime.datetime.now().isoformat(timespec="seconds"),
+      "python": platform.python_version(),
+      "platform": platform.platform(),
+      "repeat": args.repeat,
+      "seed": args.seed,
+      "results": results,
+    }
+    (LAUNCH_DIR / args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+  main.upload_queue.close()
+  main.executor.shutdown(wait=True)
+  shutil.rmtree(WORK_DIR, ignore_errors=True)
@@ -0,0 +1,124 @@
+import contextlib
+import socket
+import threading
+import time
+
+from paramiko import SSHClient, SSHException
+
+
+CONNECT_TIMEOUT = 10
+IO_TIMEOUT = 30
+KEEPALIVE_INTERVAL = 15
+MIN_BACKOFF = 1
+MAX_BACKOFF = 300
+CONNECTION_ERRORS = (SSHException, OSError, EOFError, socket.timeout)
+
+
+class ConnectionUnavailable(Exception):
+  pass
+
+
+class SshConnection:
+  # One SSH transport shared by every sync channel, reconnected lazily after it dies.
+  def __init__(self, host, user, keepalive=KEEPALIVE_INTERVAL, timeout=CONNECT_TIMEOUT, io_timeout=IO_TIMEOUT):
+    self.host = host
+    self.user = user
+    self.keepalive = keepalive
+    self.timeout = timeout
+    self.io_timeout = io_timeout
+    self.lock = threading.Lock()
+    self.connect_lock = threading.Lock()
+    self.generation = 0
+    self.ssh = None
+    self.failures = 0
+    self.retry_at = 0
+    self.last_error = None
+
+  def is_active(self):
+    ssh = self.ssh
+    transport = ssh.get_transport() if ssh is not None else None
+    return transport is not None and transport.is_active()
+
+  def connect(self):
+    ssh = SSHClient()
+    ssh.load_system_host_keys()
+    ssh.connect(
+      self.host,
+      username=self.user,
+      timeout=self.timeout,
+      banner_timeout=self.timeout,
+      auth_timeout=self.timeout,
+    )
+    ssh.get_transport().set_keepalive(self.keepalive)
+    return ssh
+
+  def client(self):
+    # connect_lock lets one thread reconnect at a time; lock only guards the fields,
+    # so close() on the GUI thread never waits for a slow handshake.
+    with self.connect_lock:
+      with self.lock:
+        if self.is_active():
+          return self.ssh
+        dead = self.take()
+        now = time.monotonic()
+        generation = self.generation
+      if dead is not None:
+        dead.close()
+      if now < self.retry_at:
+        raise ConnectionUnavailable(f"Reconnect to {self.host} postponed: {self.last_error}")
+      try:
+        ssh = self.connect()
+      except CONNECTION_ERRORS as error:
+        with self.lock:
+          self.failures += 1
+          self.last_error = error
+          self.retry_at = now + min(MIN_BACKOFF * 2 ** (self.failures - 1), MAX_BACKOFF)
+        raise ConnectionUnavailable(f"Cannot connect to {self.host}: {error}") from error
+      with self.lock:
+        closed = self.generation != generation
+        if not closed:
+          self.ssh = ssh
+          self.failures = 0
+          self.last_error = None
+      if closed:
+        ssh.close()
+        raise ConnectionUnavailable(f"Connection to {self.host} was closed")
+      return ssh
+
+  def take(self):
+    ssh, self.ssh = self.ssh, None
+    return ssh
+
+  def broken(self, error):
+    # Channel failures mean the transport is likely dead; the next call reconnects.
+    with self.lock:
+      self.last_error = error
+      ssh = self.take()
+    if ssh is not None:
+      ssh.close()
+
+  @contextlib.contextmanager
+  def guard(self):
+    try:
+      yield self
+    except CONNECTION_ERRORS as error:
+      self.broken(error)
+      raise
+
+  def exec_command(self, command):
+    with self.guard():
+      return self.client().exec_command(command, timeout=self.io_timeout)
+
+  def open_sftp(self):
+    with self.guard():
+      sftp = self.client().open_sftp()
+      sftp.get_channel().settimeout(self.io_timeout)
+      return sftp
+
+  def close(self):
+    # Also abandons a connect in progress: its result is discarded when it finishes.
+    with self.lock:
+      self.generation += 1
+      ssh = self.take()
+    if ssh is not None:
+      ssh.close()
@@ -0,0 +1,93 @@
+import hashlib
+import math
+import pathlib
+
+import numpy
+
+import delta_agent
+
+
+MIN_BLOCK_SIZE = 512
+CANDIDATE_FILTER_SIZE = 1 << 20
+# Window starts checksummed at a time; keeps the numpy temporaries to a few megabytes.
+CHECKSUM_WINDOW = 1 << 18
+AGENT_SOURCE = pathlib.Path(delta_agent.__file__).read_text(encoding="utf-8")
+
+
+def block_size_for(size):
+  return max(MIN_BLOCK_SIZE, 1 << math.ceil(math.log2(max(math.isqrt(size), 1))))
+
+
+def rolling_weak_checksums(data, block_size):
+  # Weak checksums of every block_size window, via prefix sums instead of a byte loop.
+  # Only the low 16 bits of both sums are kept, so uint32 arithmetic may wrap around.
+  values = numpy.frombuffer(data, dtype=numpy.uint8)
+  sums = numpy.zeros(len(values) + 1, dtype=numpy.uint32)
+  numpy.cumsum(values, dtype=numpy.uint32, out=sums[1:])
+  weighted_sums = numpy.zeros(len(values) + 1, dtype=numpy.uint32)
+  numpy.cumsum(numpy.arange(len(values), dtype=numpy.uint32) * values, dtype=numpy.uint32, out=weighted_sums[1:])
+  a = sums[block_size:] - sums[:-block_size]
+  ends = numpy.arange(block_size, len(values) + 1, dtype=numpy.uint32)
+  b = ends * a - (weighted_sums[block_size:] - weighted_sums[:-block_size])
+  return (a & 0xFFFF) | ((b & 0xFFFF) << 16)
+
+
+def candidate_offsets(data, block_size, known):
+  # (offset, weak checksum) of the windows that pass the bitmap, computed window by window.
+  last_start = len(data) - block_size
+  for start in range(0, last_start + 1, CHECKSUM_WINDOW):
+    stop = min(start + CHECKSUM_WINDOW, last_start + 1)
+    weak = rolling_weak_checksums(memoryview(data)[start:stop + block_size - 1], block_size)
+    hits = numpy.flatnonzero(known[weak & (CANDIDATE_FILTER_SIZE - 1)])
+    yield from zip((hits + start).tolist(), weak[hits].tolist())
+
+
+def parse_signature(signature):
+  blocks = {}
+  for index, (weak, strong) in enumerate(delta_agent.SIGNATURE.iter_unpack(signature)):
+    blocks.setdefault(weak, {}).setdefault(strong, index)
+  return blocks
+
+
+def compute_delta(signature, data, block_size):
+  blocks = parse_signature(signature)
+  operations = []
+  literal_start = 0
+  if blocks and len(data) >= block_size:
+    # Bitmap prefilter on the low bits; the dict lookup below rejects collisions.
+    known = numpy.zeros(CANDIDATE_FILTER_SIZE, dtype=bool)
+    known[numpy.fromiter(blocks, dtype=numpy.int64) & (CANDIDATE_FILTER_SIZE - 1)] = True
+    position = 0
+    for offset, weak in candidate_offsets(data, block_size, known):
+      if offset < position:
+        continue
+      strong = delta_agent.strong_checksum(data[offset:offset + block_size])
+      block = blocks.get(weak, {}).get(strong)
+      if block is None:
+        continue
+      if offset > literal_start:
+        operations.append(("D", data[literal_start:offset]))
+      if operations and operations[-1][0] == "C" and operations[-1][1][0] + operations[-1][1][1] == block:
+        first_block, count = operations[-1][1]
+        operations[-1] = ("C", (first_block, count + 1))
+      else:
+        operations.append(("C", (block, 1)))
+      position = literal_start = offset + block_size
+  if literal_start < len(data):
+    operations.append(("D", data[literal_start:]))
+  return encode_delta(hashlib.md5(data).digest(), block_size, operations)
+
+
+def encode_delta(digest, block_size, operations):
+  chunks = [delta_agent.HEADER.pack(digest, block_size)]
+  for kind, payload in operations:
+    if kind == "C":
+      chunks.append(delta_agent.COPY.pack(b"C", *payload))
+    else:
+      chunks.append(delta_agent.DATA.pack(b"D", len(payload)))
+      chunks.append(payload)
+  return b"".join(chunks)
+
+
+def apply_delta(base, delta):
+  return delta_agent.patch(base, delta)
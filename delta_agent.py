@@ -0,0 +1,85 @@
+import gzip
+import hashlib
+import itertools
+import os
+import struct
+import sys
+
+
+# Runs on the remote host through `python3 -c`, so it may only use the standard library.
+SIGNATURE = struct.Struct("<I8s")
+HEADER = struct.Struct("<16sI")
+COPY = struct.Struct("<cII")
+DATA = struct.Struct("<cI")
+
+
+def weak_checksum(block):
+  a = sum(block) & 0xFFFF
+  b = sum(itertools.accumulate(block)) & 0xFFFF
+  return a | (b << 16)
+
+
+def strong_checksum(block):
+  return hashlib.md5(block).digest()[:8]
+
+
+def signature(data, block_size):
+  return b"".join(
+    SIGNATURE.pack(weak_checksum(block), strong_checksum(block))
+    for block in (data[offset:offset + block_size] for offset in range(0, len(data), block_size))
+  )
+
+
+def patch(base, delta):
+  digest, block_size = HEADER.unpack_from(delta)
+  offset = HEADER.size
+  result = []
+  while offset < len(delta):
+    kind = delta[offset:offset + 1]
+    if kind == b"C":
+      _, first_block, count = COPY.unpack_from(delta, offset)
+      offset += COPY.size
+      result.append(base[first_block * block_size:(first_block + count) * block_size])
+    elif kind == b"D":
+      _, length = DATA.unpack_from(delta, offset)
+      offset += DATA.size
+      result.append(delta[offset:offset + length])
+      offset += length
+    else:
+      raise ValueError("Corrupted delta")
+  result = b"".join(result)
+  if hashlib.md5(result).digest() != digest:
+    raise ValueError("Patched file does not match the expected checksum")
+  return result
+
+
+def main(argv):
+  command, path = argv[1], argv[2]
+  if command == "signature":
+    if not os.path.exists(path):
+      return 2
+    with open(path, "rb") as fin:
+      sys.stdout.buffer.write(signature(fin.read(), int(argv[3])))
+    return 0
+  if command == "patch":
+    mtime = int(argv[3])
+    with open(path, "rb") as fin:
+      base = fin.read()
+    delta = sys.stdin.buffer.read()
+    if argv[4:] == ["gzip"]:
+      delta = gzip.decompress(delta)
+    try:
+      result = patch(base, delta)
+    except ValueError:
+      return 3
+    temporary_path = path + ".part"
+    with open(temporary_path, "wb") as fout:
+      fout.write(result)
+    os.replace(temporary_path, path)
+    os.utime(path, (mtime, mtime))
+    return 0
+  return 1
+
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv))
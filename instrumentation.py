@@ -0,0 +1,131 @@
+import cProfile
+import collections
+import csv
+import datetime
+import functools
+import json
+import os
+import pathlib
+import threading
+import time
+
+
+# Set to a .json or .csv path to record timers and counters; unset means no overhead at all.
+OUTPUT_ENV = "FLASH_CARDS_INSTRUMENTATION"
+EXPORT_INTERVAL = 60
+MAX_EXPORT_BYTES = 1024 * 1024
+PROFILES_FOLDER = "profiles"
+
+output_path = os.environ.get(OUTPUT_ENV)
+enabled = bool(output_path)
+lock = threading.Lock()
+# name -> [calls, total seconds, max seconds]
+timers = collections.defaultdict(lambda: [0, 0.0, 0.0])
+counters = collections.Counter()
+last_export = time.monotonic()
+
+profiler = None
+profile_armed = False
+on_profile_saved = None
+
+
+def timed(name):
+  def decorator(function):
+    # Decided when the function is defined, so disabled timers cost nothing per call.
+    if not enabled:
+      return function
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+      started = time.perf_counter()
+      try:
+        return function(*args, **kwargs)
+      finally:
+        record(name, time.perf_counter() - started)
+    return wrapper
+  return decorator
+
+
+def record(name, seconds):
+  with lock:
+    stat = timers[name]
+    stat[0] += 1
+    stat[1] += seconds
+    stat[2] = max(stat[2], seconds)
+  if time.monotonic() - last_export >= EXPORT_INTERVAL:
+    export()
+
+
+def count(name, value=1):
+  if enabled:
+    with lock:
+      counters[name] += value
+
+
+def snapshot():
+  with lock:
+    return {
+      "time": datetime.datetime.now().isoformat(timespec="seconds"),
+      "timers": {
+        name: {"calls": calls, "total_seconds": round(total, 6), "max_seconds": round(longest, 6)}
+        for name, (calls, total, longest) in timers.items()
+      },
+      "counters": dict(counters),
+    }
+
+
+def rotate(path):
+  if path.exists() and path.stat().st_size >= MAX_EXPORT_BYTES:
+    path.replace(path.with_name(path.name + ".1"))
+
+
+def export():
+  global last_export
+  if not enabled:
+    return
+  last_export = time.monotonic()
+  path = pathlib.Path(output_path)
+  rotate(path)
+  report = snapshot()
+  if path.suffix.lower() == ".csv":
+    write_header = not path.exists()
+    with path.open("a", encoding="utf-8", newline="") as fout:
+      writer = csv.writer(fout)
+      if write_header:
+        writer.writerow(["time", "kind", "name", "calls", "total_seconds", "max_seconds"])
+      for name, stat in report["timers"].items():
+        writer.writerow([report["time"], "timer", name, stat["calls"], stat["total_seconds"], stat["max_seconds"]])
+      for name, value in report["counters"].items():
+        writer.writerow([report["time"], "counter", name, value, "", ""])
+  else:
+    with path.open("a", encoding="utf-8") as fout:
+      fout.write(json.dumps(report) + "\n")
+
+
+def profile_next_session(on_saved=None):
+  global profile_armed, on_profile_saved
+  profile_armed = True
+  on_profile_saved = on_saved
+
+
+def session_started():
+  global profiler, profile_armed
+  if not profile_armed or profiler is not None:
+    return
+  profile_armed = False
+  profiler = cProfile.Profile()
+  profiler.enable()
+
+
+def session_finished():
+  global profiler
+  if profiler is None:
+    return None
+  profiler.disable()
+  folder = pathlib.Path(PROFILES_FOLDER)
+  folder.mkdir(exist_ok=True)
+  path = folder / f"training-{datetime.datetime.now():%Y%m%d-%H%M%S}.prof"
+  profiler.dump_stats(path)
+  profiler = None
+  if on_profile_saved is not None:
+    on_profile_saved(path)
+  return path
@@ -0,0 +1,129 @@
+import hashlib
+import itertools
+import json
+import pathlib
+
+
+JOURNAL_SUFFIX = ".journal"
+STALE_SUFFIX = ".stale"
+COMPACTION_THRESHOLD = 256 * 1024
+
+
+def journal_path(list_path):
+  list_path = pathlib.Path(list_path)
+  return list_path.with_name(list_path.name + JOURNAL_SUFFIX)
+
+
+def set_aside(path):
+  # A journal of another snapshot cannot be replayed, but it holds local edits; keep it for the user.
+  for number in itertools.count():
+    stale_path = path.with_name(path.name + STALE_SUFFIX + (f"{number}" if number else ""))
+    if not stale_path.exists():
+      path.replace(stale_path)
+      return stale_path
+
+
+def snapshot_hasher():
+  return hashlib.sha1()
+
+
+def snapshot_hash(data):
+  hasher = snapshot_hasher()
+  hasher.update(data)
+  return hasher.hexdigest()
+
+
+def journal_hash(path):
+  # Hash of the snapshot the journal was written against, or None for a missing or empty journal.
+  if not path.exists():
+    return None
+  with path.open("r", encoding="utf-8") as fin:
+    line = fin.readline()
+  if not line.strip():
+    return None
+  try:
+    header = json.loads(line)
+  except json.JSONDecodeError:
+    return ""
+  return header.get("hash", "") if header.get("op") == "base" else ""
+
+
+def read_journal(path, base_hash):
+  if not path.exists():
+    return []
+  with path.open("r", encoding="utf-8") as fin:
+    lines = [line for line in fin.read().splitlines() if line]
+  if not lines:
+    return []
+  header = json.loads(lines[0])
+  # A journal written against another snapshot (e.g. replaced by sync) is stale.
+  if header.get("op") != "base" or header.get("hash") != base_hash:
+    return None
+  operations = []
+  for line in lines[1:]:
+    try:
+      operations.append(json.loads(line))
+    except json.JSONDecodeError:
+      # Torn line left by an interrupted append.
+      continue
+  return operations
+
+
+def append_journal(path, base_hash, operations):
+  if not operations:
+    return
+  new_journal = not path.exists() or path.stat().st_size == 0
+  torn_tail = False
+  if not new_journal:
+    with path.open("rb") as fin:
+      fin.seek(-1, 2)
+      torn_tail = fin.read(1) != b"\n"
+  with path.open("a", encoding="utf-8") as fout:
+    if new_journal:
+      fout.write(json.dumps({"op": "base", "hash": base_hash}) + "\n")
+    elif torn_tail:
+      fout.write("\n")
+    fout.write("".join(json.dumps(operation, ensure_ascii=False) + "\n" for operation in operations))
+
+
+def needs_compaction(path):
+  return path.exists() and path.stat().st_size > COMPACTION_THRESHOLD
+
+
+def apply_operation(collection, operation):
+  op = operation["op"]
+  if op == "add":
+    collection.append({"words": list(operation["words"]), "score": 0})
+  elif op == "edit":
+    collection[operation["index"]]["words"] = list(operation["words"])
+  elif op == "delete":
+    del collection[operation["index"]]
+  elif op == "score":
+    record = collection[operation["index"]]
+    record[operation["field"]] = record.get(operation["field"], 0) + operation["delta"]
+
+
+def fits(length, operations):
+  # Whether every operation refers to a record that exists at its point of the journal.
+  for operation in operations:
+    op = operation.get("op")
+    if op in ("add", "edit") and len(operation.get("words", ())) != 2:
+      return False
+    if op == "score" and not ("field" in operation and "delta" in operation):
+      return False
+    if op == "add":
+      length += 1
+      continue
+    if op not in ("edit", "delete", "score"):
+      return False
+    index = operation.get("index")
+    if not isinstance(index, int) or not 0 <= index < length:
+      return False
+    if op == "delete":
+      length -= 1
+  return True
+
+
+def replay(collection, operations):
+  for operation in operations:
+    apply_operation(collection, operation)
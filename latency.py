@@ -0,0 +1,165 @@
+import bisect
+import collections
+import datetime
+import sys
+import threading
+import time
+import traceback
+
+from PySide6.QtCore import QEvent, QObject, QTimer
+
+
+STALL_THRESHOLD = 0.2
+HEARTBEAT_INTERVAL = 0.05
+MAX_STALLS = 50
+HISTOGRAM_BOUNDS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+
+class LatencyHistogram:
+  def __init__(self):
+    self.buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+    self.count = 0
+    self.total = 0.0
+    self.max = 0.0
+
+  def record(self, seconds):
+    self.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS, seconds)] += 1
+    self.count += 1
+    self.total += seconds
+    self.max = max(self.max, seconds)
+
+  def percentile(self, fraction):
+    # Upper bound of the bucket holding the requested share of samples.
+    seen = 0
+    for bound, samples in zip(HISTOGRAM_BOUNDS + (self.max,), self.buckets):
+      seen += samples
+      if seen >= fraction * self.count:
+        return min(bound, self.max)
+    return self.max
+
+
+histograms = collections.defaultdict(LatencyHistogram)
+
+
+def record_latency(name, seconds):
+  histograms[name].record(seconds)
+
+
+class PaintProbe(QObject):
+  # Calls on_paint once, on the next paint of the watched widget.
+  def __init__(self, widget, on_paint):
+    super().__init__(widget)
+    self.on_paint = on_paint
+    widget.installEventFilter(self)
+
+  def eventFilter(self, watched, event):
+    if event.type() == QEvent.Type.Paint:
+      self.cancel()
+      self.on_paint()
+    return False
+
+  def cancel(self):
+    self.parent().removeEventFilter(self)
+    self.deleteLater()
+
+
+pending_paints = {}
+
+
+def until_paint(name, widget, started):
+  # One measurement per name at a time, so paints that never come do not pile up.
+  if not widget.isVisible():
+    return
+  if name in pending_paints:
+    pending_paints.pop(name).cancel()
+  def on_paint():
+    del pending_paints[name]
+    record_latency(name, time.perf_counter() - started)
+  pending_paints[name] = PaintProbe(widget, on_paint)
+
+
+class KeystrokeProbe(QObject):
+  def __init__(self, widgets):
+    super().__init__()
+    self.pressed_at = None
+    for widget in widgets:
+      widget.installEventFilter(self)
+
+  def eventFilter(self, watched, event):
+    if event.type() == QEvent.Type.KeyPress:
+      self.pressed_at = time.perf_counter()
+    return False
+
+  def take(self):
+    pressed_at, self.pressed_at = self.pressed_at, None
+    return pressed_at
+
+
+class StallWatchdog(QObject):
+  # A GUI-thread timer beats; a watcher thread notices missed beats and grabs the GUI stack.
+  def __init__(self, threshold=STALL_THRESHOLD, interval=HEARTBEAT_INTERVAL):
+    super().__init__()
+    self.threshold = threshold
+    self.interval = interval
+    self.gui_thread_id = threading.get_ident()
+    self.lock = threading.Lock()
+    self.last_beat = time.monotonic()
+    self.current_stall = None
+    self.stalls = collections.deque(maxlen=MAX_STALLS)
+    self.stopped = threading.Event()
+    self.timer = QTimer(self)
+    self.timer.timeout.connect(self.beat)
+    self.thread = threading.Thread(target=self.watch, name="stall-watchdog", daemon=True)
+
+  def start(self):
+    self.last_beat = time.monotonic()
+    self.timer.start(int(self.interval * 1000))
+    self.thread.start()
+
+  def stop(self):
+    self.stopped.set()
+    self.timer.stop()
+
+  def beat(self):
+    now = time.monotonic()
+    with self.lock:
+      gap = now - self.last_beat
+      self.last_beat = now
+      stall, self.current_stall = self.current_stall, None
+    record_latency("event_loop_lag", max(gap - self.interval, 0))
+    if stall is not None:
+      stall["seconds"] = gap
+      self.stalls.append(stall)
+
+  def watch(self):
+    while not self.stopped.wait(self.interval):
+      with self.lock:
+        blocked = time.monotonic() - self.last_beat
+        if blocked < self.threshold or self.current_stall is not None:
+          continue
+        frame = sys._current_frames().get(self.gui_thread_id)
+        self.current_stall = {
+          "started": datetime.datetime.now() - datetime.timedelta(seconds=blocked),
+          "stack": "".join(traceback.format_stack(frame)) if frame is not None else "",
+        }
+
+
+def report(watchdog=None):
+  lines = []
+  for name, histogram in sorted(histograms.items()):
+    lines.append(
+      f"{name}: {histogram.count} раз, среднее {histogram.total / histogram.count * 1000:.1f} мс,"
+      f" p50 {histogram.percentile(0.5) * 1000:.1f} мс, p95 {histogram.percentile(0.95) * 1000:.1f} мс,"
+      f" максимум {histogram.max * 1000:.1f} мс"
+    )
+    low = 0.0
+    for bound, samples in zip(HISTOGRAM_BOUNDS + (float("inf"),), histogram.buckets):
+      if samples:
+        lines.append(f"  {low * 1000:g}-{bound * 1000:g} мс: {samples}")
+      low = bound
+  if watchdog is not None:
+    lines.append(f"Зависания дольше {watchdog.threshold * 1000:g} мс: {len(watchdog.stalls)}")
+    for stall in reversed(watchdog.stalls):
+      lines.append(f"{stall['started']:%H:%M:%S} — {stall['seconds'] * 1000:.0f} мс")
+      lines.append(stall["stack"])
+  return "\n".join(lines)
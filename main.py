@@ -1,3 +1,7 @@
+import time
+
+STARTUP_STARTED = time.perf_counter()
+
 import pathlib
 import sys
 import dataclasses
@@ -5,43 +9,74 @@ import random
 import json
 import datetime
 import unicodedata
-import re
 import os
+import sqlite3
+import threading
 import concurrent.futures
 
-from paramiko import SSHClient
-from scp import SCPClient
-
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QObject, Qt, QTimer, Signal
+from PySide6.QtGui import QAction, QKeySequence
 from PySide6.QtWidgets import (
   QApplication,
   QDialog,
   QMainWindow,
   QPushButton,
-  QLineEdit,
   QLabel,
+  QPlainTextEdit,
   QDialogButtonBox,
   QFileDialog,
   QFormLayout,
+  QHeaderView,
+  QLineEdit,
+  QListWidget,
   QVBoxLayout,
   QSpinBox,
   QWidget,
 )
 
+# Dialog UI modules, the SSH stack and everything built on numpy are imported where they are first needed.
 import ui_main_window
-import ui_add_word
-import ui_train_finish
-import ui_edit_words_list
-import ui_spelling_task
-import ui_settings
-import ui_net_settings
+
+import instrumentation
+import journal
+import latency
+import scripts
+import stats
+import storage
+import sync
+from word_collection import UNTAGGED, WordCollection
+
+IMPORTS_FINISHED = time.perf_counter()
 
 
 CARDS_COUNT = 5
+# Imported inside functions of this file; --startup-profile reports any that got loaded anyway.
+LAZY_MODULES = (
+  "connection",
+  "scheduler",
+  "search_index",
+  "ui_add_word",
+  "ui_edit_words_list",
+  "ui_net_settings",
+  "ui_settings",
+  "ui_spelling_task",
+  "ui_train_finish",
+)
+# Not imported by this file directly, but slow enough to watch in --startup-profile.
+LAZY_DEPENDENCIES = ("numpy", "paramiko")
+LOAD_BATCH_SIZE = 5000
+MAX_PENDING_BATCHES = 2
+# Smaller lists load synchronously; streaming only pays off when parsing is noticeable.
+STREAM_MIN_BYTES = 4 * 1024 * 1024
+# A list read with this many untagged records (e.g. saved before tags were stored) is
+# rewritten on the next save, so later loads skip classifying it.
+RETAG_SAVE_MIN = 1000
 
 LOCALIZATION = {
   "train_length": "Количество слов для тренировки",
   "repetitions_to_train": "Количество повторений для выучивания",
   "active_pool_size": "Количество активно изучаемых новых слов",
+  "retry_distance": "Через сколько слов повторить ошибку",
   "cards": "Упржнение с карточками",
   "spelling": "Упражнение с написанием перевода",
 }
@@ -53,15 +88,21 @@ class ExcerciseSettings:
   active_pool_size : int = 25
 
 
+@dataclasses.dataclass
+class SpellingSettings(ExcerciseSettings):
+  retry_distance : int = 3
+
+
 @dataclasses.dataclass
 class Settings:
-  cards : ExcerciseSettings = ExcerciseSettings()
-  spelling : ExcerciseSettings = ExcerciseSettings(20, 20, 10)
+  cards : ExcerciseSettings = dataclasses.field(default_factory=ExcerciseSettings)
+  spelling : SpellingSettings = dataclasses.field(default_factory=lambda: SpellingSettings(20, 20, 10))
 
 @dataclasses.dataclass
 class NetSettings:
   ip : str = ""
   user : str = ""
+  compression : str = ""
 
 
 REMOTE_FOLDER_NAME = "flash_cards"
@@ -70,12 +111,12 @@ NETWORK_SETTINGS_FILENAME = "network.json"
 
 def load_settings():
   settings = Settings()
-  local_sync_file(SETTINGS_FILENAME)
   if os.path.exists(SETTINGS_FILENAME):
     with open(SETTINGS_FILENAME, "r", encoding="utf-8") as fin:
       settings_json = json.loads(fin.read())
+      settings_types = {field.name: field.type for field in dataclasses.fields(Settings)}
       for excersize, ex_settings in settings_json.items():
-        setattr(settings, excersize, ExcerciseSettings(**ex_settings))
+        setattr(settings, excersize, settings_types.get(excersize, ExcerciseSettings)(**ex_settings))
   return settings
 
 
@@ -85,52 +126,94 @@ def save_settings():
   remote_sync_file(SETTINGS_FILENAME)
 
 
+def apply_settings(settings):
+  for field in dataclasses.fields(Settings):
+    setattr(SETTINGS, field.name, getattr(settings, field.name))
+
+
 def load_net_settings():
   settings = NetSettings()
   if os.path.exists(NETWORK_SETTINGS_FILENAME):
     with open(NETWORK_SETTINGS_FILENAME, "r", encoding="utf-8") as fin:
       settings = NetSettings(**json.loads(fin.read()))
-      ssh.load_system_host_keys()
-      ssh.connect(settings.ip, username=settings.user)
   return settings
 
 
 def save_net_settings():
-  ssh.load_system_host_keys()
-  ssh.connect(NET_SETTINGS.ip, username=NET_SETTINGS.user)
   with open(NETWORK_SETTINGS_FILENAME, "w", encoding="utf-8") as fout:
     fout.write(json.dumps(dataclasses.asdict(NET_SETTINGS)))
+  start_network()
+
+
+def start_network():
+  global ssh, sync_engine
+  if ssh is not None:
+    ssh.close()
+  ssh = None
+  sync_engine = None
+  if NET_SETTINGS.ip:
+    import connection
+    ssh = connection.SshConnection(NET_SETTINGS.ip, NET_SETTINGS.user)
+    sync_engine = sync.SyncEngine(sync.SshRemote(ssh, REMOTE_FOLDER_NAME, NET_SETTINGS.compression))
+  return ssh
+
+
+def sync_in_background(on_settings_synced, on_list_synced):
+  if start_network() is None:
+    return None
+  def impl():
+    # One manifest round trip and one SFTP session for every synced file.
+    return sync_engine.sync([SETTINGS_FILENAME])
+  def notify(future):
+    if future.exception() is not None:
+      return
+    for path in future.result():
+      if path == SETTINGS_FILENAME:
+        on_settings_synced()
+      else:
+        on_list_synced(os.path.abspath(path))
+  future = executor.submit(impl)
+  future.add_done_callback(notify)
+  return future
+
+
+@instrumentation.timed("local_sync_file")
+def local_sync_file(filepath):
+  if sync_engine is None:
+    return False
+  return bool(sync_engine.pull([filepath]))
 
 
-def local_sync_file(filepath):
-  if not NET_SETTINGS.ip:
-    return
-  with SCPClient(ssh.get_transport()) as scp:
-    remote_path = f"{REMOTE_FOLDER_NAME}/{pathlib.Path(filepath).as_posix()}"
-    remote_ts = ssh.exec_command(f"stat -c %Y {remote_path}")[1].read().decode()
-    if remote_ts:
-      remote_time = int(remote_ts)
-      local_time = int(os.path.getmtime(filepath) if os.path.exists(filepath) else 0)
-      if remote_time >= local_time:
-        scp.get(remote_path, filepath, preserve_times=True)
+def pull_list_in_background(paths, on_pulled):
+  if sync_engine is None:
+    return None
+  def impl():
+    return [path for path in paths if local_sync_file(path)]
+  def notify(future):
+    if future.exception() is None and future.result():
+      on_pulled()
+  future = executor.submit(impl)
+  future.add_done_callback(notify)
+  return future
+
+
+# Runs on the upload queue's worker; the transfer is what the timer is for.
+@instrumentation.timed("remote_sync_file")
+def upload_file(filepath):
+  sync_engine.push([filepath])
 
 
 def remote_sync_file(filepath):
-  if not NET_SETTINGS.ip:
+  if sync_engine is None:
     return
-  def impl(filepath):
-    with SCPClient(ssh.get_transport()) as scp:
-      local_path = pathlib.Path(filepath)
-      remote_subpath = local_path.as_posix()
-      remote_path = f"{REMOTE_FOLDER_NAME}/{remote_subpath}"
-      if os.path.exists(filepath):
-        ssh.exec_command(f"mkdir -p {REMOTE_FOLDER_NAME}/{local_path.parent.as_posix()}")
-        scp.put(filepath, remote_path, preserve_times=True)
-  return executor.submit(impl, filepath)
-
-
-ssh = SSHClient()
+  upload_queue.submit(filepath)
+
+
+ssh = None
+sync_engine = None
 executor = concurrent.futures.ThreadPoolExecutor()
+upload_queue = sync.UploadQueue(upload_file)
+stall_watchdog = None
 NET_SETTINGS = load_net_settings()
 SETTINGS = load_settings()
 
@@ -144,13 +227,36 @@ state_to_color = [
   "FFBE9E",
 ]
 
+state_to_stylesheet = [
+  f'QPushButton {{background-color: #{color}; font: 24px;}}'
+  for color in state_to_color
+]
+
 buttons = {
   "left": [],
   "right": [],
 }
 
-greek_pattern = re.compile(r'[\u0370-\u03FF\u1F00-\u1FFF]')
-english_pattern = re.compile(r'[a-zA-Z]')
+rendered_buttons = {
+  "left": [],
+  "right": [],
+}
+
+
+class CombiningMarksTable(dict):
+  # str.translate table that drops combining marks, filled in per code point on first sight.
+  def __missing__(self, codepoint):
+    value = None if unicodedata.combining(chr(codepoint)) else codepoint
+    self[codepoint] = value
+    return value
+
+
+COMBINING_MARKS = CombiningMarksTable()
+
+
+def normalize_word(word):
+  return unicodedata.normalize('NFD', word.strip().lower()).translate(COMBINING_MARKS)
+
 
 class Context:
   def __init__(self):
@@ -159,35 +265,174 @@ class Context:
       "left": [EMPTY] * CARDS_COUNT,
       "right": [EMPTY] * CARDS_COUNT,
     }
-    self.collection = []
+    self.slot_words = {
+      "left": [None] * CARDS_COUNT,
+      "right": [None] * CARDS_COUNT,
+    }
+    self.dirty_slots = set()
+    self.mark_all_dirty()
+    self.collection = WordCollection()
     self.score = 0
     self.errors = 0
     self.active_list_path = None
     self.active_button = None
     self.train_start = None
+    self._scheduler = None
+    self._learned_count = None
+    self.word_index = {}
+    self._storage = None
+    self._stats = None
+    self.pending_changes = []
+    self.score_deltas = {}
+    self.loading = False
+    self.loaded_untrained = 0
+    self.loaded_untagged = 0
+    self.retag_pending = False
+    self.journal_pending = False
 
   def reset(self):
+    if self._scheduler is not None:
+      for word in self.active_words:
+        self._scheduler.deactivate(word.index)
     self.active_words = []
     self.words_state = {
       "left": [EMPTY] * CARDS_COUNT,
       "right": [EMPTY] * CARDS_COUNT,
     }
+    self.slot_words = {
+      "left": [None] * CARDS_COUNT,
+      "right": [None] * CARDS_COUNT,
+    }
+    self.mark_all_dirty()
     self.score = 0
     self.errors = 0
     self.active_button = None
     self.train_start = None
 
-  def is_word_active(self, idx):
-    return any(idx == x.index for x in self.active_words)
-
   def is_trained_word(self, idx):
-    return self.collection[idx]["score"] >= SETTINGS.cards.repetitions_to_train
+    return self.collection.score[idx] >= SETTINGS.cards.repetitions_to_train
 
   def is_spelling_trained_word(self, idx):
-    return self.collection[idx].get("spelling_score", 0) >= SETTINGS.spelling.repetitions_to_train
+    return self.collection.spelling_score[idx] >= SETTINGS.spelling.repetitions_to_train
 
   def activate_word(self, left_idx, right_idx):
-    self.active_words.append(ActiveWord(select_word(), left_idx, right_idx))
+    index = select_word()
+    self.scheduler.activate(index)
+    self.active_words.append(ActiveWord(index, left_idx, right_idx))
+    self.set_slot_word("left", left_idx, index)
+    self.set_slot_word("right", right_idx, index)
+
+  def deactivate_word(self, word_idx):
+    word = self.active_words[word_idx]
+    self.scheduler.deactivate(word.index)
+    self.active_words = self.active_words[:word_idx] + self.active_words[word_idx + 1:]
+    self.set_slot_word("left", word.left_offset, None)
+    self.set_slot_word("right", word.right_offset, None)
+
+  def set_state(self, side, idx, state):
+    if self.words_state[side][idx] != state:
+      self.words_state[side][idx] = state
+      self.dirty_slots.add((side, idx))
+
+  def set_slot_word(self, side, idx, index):
+    self.slot_words[side][idx] = index
+    self.dirty_slots.add((side, idx))
+
+  def slot_text(self, side, idx):
+    index = self.slot_words[side][idx]
+    if index is None:
+      return ""
+    return self.collection.words(index)[0 if side == "left" else 1]
+
+  def mark_all_dirty(self):
+    self.dirty_slots.update((side, idx) for side in ["left", "right"] for idx in range(CARDS_COUNT))
+
+  def take_dirty_slots(self):
+    dirty_slots, self.dirty_slots = self.dirty_slots, set()
+    return dirty_slots
+
+  def change_score(self, idx, delta, field="score"):
+    record = self.collection[idx]
+    was_trained = self.is_trained_word(idx)
+    record[field] = record.get(field, 0) + delta
+    self.score_deltas[(idx, field)] = self.score_deltas.get((idx, field), 0) + delta
+    if field == "score":
+      self.scheduler.update_score(idx, record["score"])
+      if self._learned_count is not None:
+        self._learned_count[1] += self.is_trained_word(idx) - was_trained
+
+  def add_record(self, words):
+    self.collection.append({"words": words, "score": 0})
+    self.index_record(len(self.collection) - 1)
+    self.invalidate_scheduler()
+    self.record_change({"op": "add", "words": list(words)})
+
+  def record_change(self, operation):
+    self.flush_score_deltas()
+    self.pending_changes.append(operation)
+
+  def flush_score_deltas(self):
+    self.pending_changes += [
+      {"op": "score", "index": idx, "field": field, "delta": delta}
+      for (idx, field), delta in self.score_deltas.items()
+      if delta != 0
+    ]
+    self.score_deltas = {}
+
+  @property
+  def scheduler(self):
+    if self._scheduler is None or not self._scheduler.matches(SETTINGS.cards):
+      import scheduler
+      self._scheduler = scheduler.WordScheduler(self.collection.score, SETTINGS.cards)
+      for word in self.active_words:
+        self._scheduler.activate(word.index)
+    return self._scheduler
+
+  def invalidate_scheduler(self):
+    self._scheduler = None
+    self._learned_count = None
+
+  def indexed_storage(self):
+    # A SQLite list answers lookups from its indexes once the changes since the last dump are written.
+    if not self.has_list or self.loading or not isinstance(self.storage, storage.SqliteStorage):
+      return None
+    if self.pending_changes or self.score_deltas:
+      self.dump_list()
+    return self.storage
+
+  def untrained_pool(self, settings, field):
+    # None when the pool has to be picked from the loaded scores.
+    indexed = self.indexed_storage()
+    if indexed is None:
+      return None
+    return indexed.untrained_words(settings.repetitions_to_train, settings.active_pool_size, field)
+
+  @property
+  def learned_count(self):
+    threshold = SETTINGS.cards.repetitions_to_train
+    if (indexed := self.indexed_storage()) is not None:
+      return indexed.trained_count(threshold)
+    if self._learned_count is None or self._learned_count[0] != threshold:
+      import scheduler
+      self._learned_count = [threshold, scheduler.trained_count(self.collection.score, SETTINGS.cards)]
+    return self._learned_count[1]
+
+  def index_record(self, idx):
+    for word in self.collection.words(idx):
+      self.word_index.setdefault(normalize_word(word), []).append(idx)
+
+  def rebuild_word_index(self):
+    self.word_index = {}
+    for idx in range(len(self.collection)):
+      self.index_record(idx)
+
+  def find_word(self, word, exact=True):
+    if exact and (indexed := self.indexed_storage()) is not None:
+      return indexed.find_word(word)
+    indices = self.word_index.get(normalize_word(word), [])
+    if exact:
+      return [idx for idx in indices if word in self.collection.words(idx)]
+    return indices
 
   @property
   def words_to_fill(self):
@@ -201,79 +446,195 @@ class Context:
   def has_list(self):
     return self.active_list_path is not None
 
+  @property
+  def storage(self):
+    if self._storage is None or self._storage.path != self.active_list_path:
+      self._storage = storage.open_storage(self.active_list_path)
+    return self._storage
+
+  @property
+  def stats(self):
+    if self._stats is None or self._stats.list_path != self.active_list_path:
+      self._stats = stats.StatsStore(self.active_list_path)
+    return self._stats
+
+  @property
+  def list_files(self):
+    return self.storage.files
+
   def auto_correction(self):
-    for record in self.collection:
-      word1, word2 = record["words"]
-      if greek_pattern.search(word1):
-        record["words"] = [word2, word1]
-      elif greek_pattern.search(word2):
-        record["words"] = [word1, word2]
-      elif english_pattern.search(word1):
-        record["words"] = [word2, word1]
-      elif english_pattern.search(word2):
-        record["words"] = [word1, word2]
-
-  def dump_list(self):
+    # Only records added or edited since the last pass are classified again.
+    collection = self.collection
+    untagged = list(collection.untagged())
+    for idx in untagged:
+      words = collection.words(idx)
+      swap, tag = scripts.classify(words)
+      if swap:
+        collection.set_words(idx, words[::-1])
+      collection.tags[idx] = tag
+    return len(untagged)
+
+  @instrumentation.timed("dump_list")
+  def dump_list(self, compact=False):
     self.auto_correction()
-    with self.active_list_path.open("w", encoding="utf-8") as fout:
-      fout.write(json.dumps(self.collection))
+    self.flush_score_deltas()
+    if self.loading:
+      # Saving a half-read list would drop the rest; finish_loading writes the changes.
+      return
+    if compact or self.retag_pending or not self.storage.can_append():
+      self.storage.save(self.collection)
+      self.retag_pending = False
+    else:
+      self.storage.append(self.pending_changes, self.collection)
+    self.pending_changes = []
 
+  @instrumentation.timed("load_list")
   def load_list(self):
-    with self.active_list_path.open("r", encoding="utf-8") as fin:
-      self.collection = json.loads(fin.read())
-    self.auto_correction()
+    self.collection = self.storage.load()
+    self.pending_changes = []
+    self.score_deltas = {}
+    self.retag_pending = self.auto_correction() >= RETAG_SAVE_MIN
+    self.invalidate_scheduler()
+    self.rebuild_word_index()
+    self.loading = False
+
+  def clear_list(self):
+    self.collection = WordCollection()
+    self.pending_changes = []
+    self.score_deltas = {}
+    self.word_index = {}
+    self.invalidate_scheduler()
+    self.loading = False
+    self.loaded_untrained = 0
+    self.loaded_untagged = 0
+    self.retag_pending = False
+    self.journal_pending = False
+
+  def begin_loading(self):
+    self.clear_list()
+    self.loading = True
+    self.journal_pending = self.storage.has_journal()
+
+  def extend_loaded(self, records, keys, untagged):
+    start = len(self.collection)
+    self.collection.extend(records)
+    for idx, record_keys in enumerate(keys, start):
+      for key in record_keys:
+        self.word_index.setdefault(key, []).append(idx)
+    if self._scheduler is not None:
+      self._scheduler.extend(self.collection.score[start:])
+    self._learned_count = None
+    self.loaded_untrained += sum(record["score"] < SETTINGS.cards.repetitions_to_train for record in records)
+    self.loaded_untagged += untagged
+
+  def finish_loading(self):
+    self.loading = False
+    self.journal_pending = False
+    operations = self.storage.stream_operations
+    if operations:
+      journal.replay(self.collection, operations)
+      self.invalidate_scheduler()
+      self.rebuild_word_index()
+      self.loaded_untagged += self.auto_correction()
+    self.retag_pending = self.loaded_untagged >= RETAG_SAVE_MIN
+    if self.pending_changes or self.score_deltas:
+      self.dump_list()
+
+  def save_loading_changes(self):
+    # Answers given while a list streams in refer to its first records, which keep their
+    # positions in a full load; read the whole list at once and write them to it.
+    self.flush_score_deltas()
+    changes = self.pending_changes
+    if not changes:
+      return
+    # The cancelled loader may still be inside the old storage object.
+    self._storage = None
+    self.load_list()
+    journal.replay(self.collection, changes)
+    self.pending_changes = changes
+    self.dump_list()
+
+  @property
+  def ready_to_train(self):
+    # While a list streams in, training starts once a full pool of new words is there; with a
+    # journal it waits for the replay, which may move the records answers refer to.
+    if not self.loading:
+      return True
+    return not self.journal_pending and self.loaded_untrained >= SETTINGS.cards.active_pool_size
 
 
 CONTEXT = Context()
+SEARCH_INDEX = None
+SEARCH_INDEX_DELAY_MS = 3000
+search_index_refresh = None
+
+
+def get_search_index():
+  global SEARCH_INDEX
+  if SEARCH_INDEX is None:
+    import search_index
+    SEARCH_INDEX = search_index.SearchIndex(".", normalize_word)
+  return SEARCH_INDEX
+
 
+def refresh_search_index(on_updated=None):
+  # One refresh at a time; callers arriving meanwhile wait for the running one.
+  global search_index_refresh
+  if search_index_refresh is None or search_index_refresh.done():
+    search_index_refresh = executor.submit(get_search_index().refresh)
+  if on_updated is not None:
+    search_index_refresh.add_done_callback(lambda future: future.exception() is None and on_updated())
+  return search_index_refresh
 
+
+def active_list_index_name():
+  if not CONTEXT.has_list:
+    return None
+  return get_search_index().list_name(CONTEXT.active_list_path)
+
+
+@instrumentation.timed("select_word")
 def select_word():
-  words = [
-    idx for idx in range(len(CONTEXT.collection))
-    if not CONTEXT.is_trained_word(idx) and not CONTEXT.is_word_active(idx)
-  ][:SETTINGS.cards.active_pool_size]
-  words += [
-    idx for idx in range(len(CONTEXT.collection))
-    if CONTEXT.is_trained_word(idx) and not CONTEXT.is_word_active(idx)
-  ]
-  weights = [
-    1 if not CONTEXT.is_trained_word(idx) else
-      0.5 * (0.95 ** (CONTEXT.collection[idx]["score"] / SETTINGS.cards.repetitions_to_train))
-    for idx in words
-  ]
-  sum_of_trainded_weights = sum([0 if weight == 1 else weight for weight in weights]) / SETTINGS.cards.active_pool_size
-  if sum_of_trainded_weights < 1:
-    sum_of_trainded_weights = 1
-  weights = [1 if weight == 1 else weight / sum_of_trainded_weights for weight in weights]
-  return random.choices(words, weights)[0]
+  return CONTEXT.scheduler.select()
 
 
+@instrumentation.timed("fill_cards")
 def fill_cards():
   empty_left = []
   empty_right = []
   for idx in range(CARDS_COUNT):
     if CONTEXT.words_state["left"][idx] == EMPTY:
       empty_left.append(idx)
-      CONTEXT.words_state["left"][idx] = HAS_WORD
+      CONTEXT.set_state("left", idx, HAS_WORD)
     if CONTEXT.words_state["right"][idx] == EMPTY:
       empty_right.append(idx)
-      CONTEXT.words_state["right"][idx] = HAS_WORD
+      CONTEXT.set_state("right", idx, HAS_WORD)
   random.shuffle(empty_right)
   for left_idx, right_idx in zip(empty_left, empty_right):
     CONTEXT.activate_word(left_idx, right_idx)
   render_buttons()
 
 
+@instrumentation.timed("render_buttons")
 def render_buttons():
-  for side in ["left", "right"]:
-    for button, state in zip(buttons[side], CONTEXT.words_state[side]):
-      button.setText("")
-      button.setStyleSheet(
-        f'QPushButton {{background-color: #{state_to_color[state]}; font: 24px;}}'
-      )
-  for word in CONTEXT.active_words:
-    buttons["left"][word.left_offset].setText(CONTEXT.collection[word.index]["words"][0])
-    buttons["right"][word.right_offset].setText(CONTEXT.collection[word.index]["words"][1])
+  repainted = 0
+  repainted_button = None
+  for side, idx in CONTEXT.take_dirty_slots():
+    if idx >= len(buttons[side]):
+      continue
+    state = CONTEXT.words_state[side][idx]
+    text = CONTEXT.slot_text(side, idx)
+    rendered_state, rendered_text = rendered_buttons[side][idx]
+    if state != rendered_state:
+      buttons[side][idx].setStyleSheet(state_to_stylesheet[state])
+    if text != rendered_text:
+      buttons[side][idx].setText(text)
+    if (state, text) != (rendered_state, rendered_text):
+      repainted += 1
+      repainted_button = buttons[side][idx]
+    rendered_buttons[side][idx] = (state, text)
+  instrumentation.count("buttons_repainted", repainted)
+  return repainted_button
 
 
 @dataclasses.dataclass
@@ -285,21 +646,22 @@ class ActiveWord:
 
 def on_button_click(label, idx):
   def process_click():
+    started = time.perf_counter()
     try:
       if CONTEXT.words_state[label][idx] == EMPTY:
         return
       current_idx = None
       current_idx = (label, idx)
       if CONTEXT.active_button == current_idx:
-        CONTEXT.words_state[label][idx] = HAS_WORD
+        CONTEXT.set_state(label, idx, HAS_WORD)
         CONTEXT.active_button = None
         return
       same_column = CONTEXT.active_button and CONTEXT.active_button[0] == label
       if same_column:
-        CONTEXT.words_state[label][CONTEXT.active_button[1]] = HAS_WORD
+        CONTEXT.set_state(label, CONTEXT.active_button[1], HAS_WORD)
       if CONTEXT.active_button is None or same_column:
         CONTEXT.active_button = current_idx
-        CONTEXT.words_state[label][idx] = CHOOSEN
+        CONTEXT.set_state(label, idx, CHOOSEN)
         return
 
       left_idx = idx if label == "left" else CONTEXT.active_button[1]
@@ -309,43 +671,54 @@ def on_button_click(label, idx):
         if word.left_offset != left_idx:
           continue
         if word.right_offset != right_idx:
-          CONTEXT.words_state[CONTEXT.active_button[0]][CONTEXT.active_button[1]] = HAS_WORD
+          CONTEXT.set_state(CONTEXT.active_button[0], CONTEXT.active_button[1], HAS_WORD)
           CONTEXT.active_button = None
-          CONTEXT.collection[CONTEXT.active_words[word_idx].index]["score"] -= 1
+          CONTEXT.change_score(CONTEXT.active_words[word_idx].index, -1)
+          CONTEXT.stats.record_answer("cards", CONTEXT.collection.words(word.index)[0], False)
           CONTEXT.errors += 1
           return
         CONTEXT.active_button = None
-        CONTEXT.words_state["left"][left_idx] = EMPTY
-        CONTEXT.words_state["right"][right_idx] = EMPTY
+        CONTEXT.set_state("left", left_idx, EMPTY)
+        CONTEXT.set_state("right", right_idx, EMPTY)
         CONTEXT.score += 1
-        CONTEXT.collection[CONTEXT.active_words[word_idx].index]["score"] += 1
+        CONTEXT.change_score(CONTEXT.active_words[word_idx].index, 1)
+        CONTEXT.stats.record_answer("cards", CONTEXT.collection.words(word.index)[0], True)
         if CONTEXT.score == SETTINGS.cards.train_length:
           FinishTrainDialog().exec()
           return
-        CONTEXT.active_words = CONTEXT.active_words[:word_idx] + CONTEXT.active_words[word_idx + 1:]
+        CONTEXT.deactivate_word(word_idx)
         if CONTEXT.words_to_fill >= random.randint(2, 3):
           fill_cards()
         break
     finally:
-      render_buttons()
+      repainted_button = render_buttons()
+      if repainted_button is not None:
+        latency.until_paint("click_to_paint", repainted_button, started)
   return process_click
 
 
 class AddWordDialog(QDialog):
+  search_index_updated = Signal()
+
+  @instrumentation.timed("AddWordDialog")
   def __init__(self, main_window):
     super(AddWordDialog, self).__init__()
+    import ui_add_word
     self.ui = ui_add_word.Ui_Dialog()
     self.ui.setupUi(self)
     self.ui.buttonBox.button(QDialogButtonBox.StandardButton.Save).clicked.connect(self.add_word)
     self.main_window = main_window
     self.main_window.setStatusTip("")
+    self.keystrokes = latency.KeystrokeProbe([self.ui.word1, self.ui.word2])
     self.ui.word1.textChanged.connect(self.update_accept_button_state)
     self.ui.word2.textChanged.connect(self.update_accept_button_state)
+    self.search_index_updated.connect(self.update_accept_button_state)
+    refresh_search_index(self.search_index_updated.emit)
     self.update_accept_button_state()
 
   def update_accept_button_state(self):
-    word1_present = any(self.ui.word1.text() in x["words"] for x in CONTEXT.collection)
-    word2_present = any(self.ui.word2.text() in x["words"] for x in CONTEXT.collection)
+    word1_present = bool(CONTEXT.find_word(self.ui.word1.text()))
+    word2_present = bool(CONTEXT.find_word(self.ui.word2.text()))
     acceptable = (
       self.ui.word1.text() != ""
       and self.ui.word2.text() != ""
@@ -358,11 +731,31 @@ class AddWordDialog(QDialog):
       self.ui.status_label.setText(f"Слово {self.ui.word1.text()} уже есть в коллекции")
     elif word2_present:
       self.ui.status_label.setText(f"Слово {self.ui.word2.text()} уже есть в коллекции")
+    else:
+      for text in [self.ui.word1.text(), self.ui.word2.text()]:
+        if similar := CONTEXT.find_word(text, exact=False):
+          similar_word = next(
+            x for x in CONTEXT.collection.words(similar[0]) if normalize_word(x) == normalize_word(text)
+          )
+          self.ui.status_label.setText(f"Похожее слово {similar_word} уже есть в коллекции")
+          break
+      else:
+        self.warn_about_other_lists()
+    pressed_at = self.keystrokes.take()
+    if pressed_at is not None:
+      latency.record_latency("keystroke_to_validate", time.perf_counter() - pressed_at)
+
+  def warn_about_other_lists(self):
+    for text in [self.ui.word1.text(), self.ui.word2.text()]:
+      found = get_search_index().search(text, exclude=active_list_index_name(), limit=1, exact=True)
+      if found:
+        self.ui.status_label.setText(f"Слово {text} уже есть в списке {found[0].list_name}")
+        return
 
   def add_word(self):
     word1 = self.ui.word1.text()
     word2 = self.ui.word2.text()
-    CONTEXT.collection.append({"words": (word1, word2), "score": 0})
+    CONTEXT.add_record((word1, word2))
     CONTEXT.dump_list()
     self.main_window.setStatusTip(
       f"Слово/фраза {word1} теперь есть в списке {CONTEXT.active_list_name}."
@@ -373,87 +766,135 @@ class AddWordDialog(QDialog):
     self.ui.status_label.setText("Слово добавлено")
 
 
+class WordsTableModel(QAbstractTableModel):
+  HEADERS = ["Слово или фраза", "Перевод", "Счёт", ""]
+  REMOVE_COLUMN = 3
+
+  def __init__(self):
+    super(WordsTableModel, self).__init__()
+    import scheduler
+    self.alive = scheduler.FenwickTree.from_values([1] * len(CONTEXT.collection))
+    self.alive_count = len(CONTEXT.collection)
+    self.removed = set()
+    self.edits = {}
+
+  def rowCount(self, parent=QModelIndex()):
+    return 0 if parent.isValid() else self.alive_count
+
+  def collection_index(self, row):
+    return self.alive.find(row)
+
+  def columnCount(self, parent=QModelIndex()):
+    return 0 if parent.isValid() else len(self.HEADERS)
+
+  def words(self, index):
+    return self.edits.get(index, CONTEXT.collection.words(index))
+
+  def data(self, model_index, role=Qt.DisplayRole):
+    if role not in (Qt.DisplayRole, Qt.EditRole):
+      return None
+    index = self.collection_index(model_index.row())
+    column = model_index.column()
+    if column < 2:
+      return self.words(index)[column]
+    if column == 2:
+      return f"{CONTEXT.collection.score[index]}/{CONTEXT.collection.spelling_score[index]}"
+    return "Удалить"
+
+  def setData(self, model_index, value, role=Qt.EditRole):
+    if role != Qt.EditRole or model_index.column() >= 2:
+      return False
+    index = self.collection_index(model_index.row())
+    words = list(self.words(index))
+    words[model_index.column()] = value
+    self.edits[index] = words
+    self.dataChanged.emit(model_index, model_index, [role])
+    return True
+
+  def flags(self, model_index):
+    flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+    if model_index.column() < 2:
+      flags |= Qt.ItemIsEditable
+    return flags
+
+  def headerData(self, section, orientation, role=Qt.DisplayRole):
+    if role != Qt.DisplayRole:
+      return None
+    if orientation == Qt.Horizontal:
+      return self.HEADERS[section]
+    return str(section)
+
+  def remove_row(self, row):
+    index = self.collection_index(row)
+    # The view only repaints the visible rows that shifted up.
+    self.beginRemoveRows(QModelIndex(), row, row)
+    self.alive.set(index, 0)
+    self.alive_count -= 1
+    self.removed.add(index)
+    self.edits.pop(index, None)
+    self.endRemoveRows()
+
+
 class ChangeListDialog(QDialog):
+  @instrumentation.timed("ChangeListDialog")
   def __init__(self, main_window):
     super(ChangeListDialog, self).__init__()
+    import ui_edit_words_list
     self.ui = ui_edit_words_list.Ui_Dialog()
     self.ui.setupUi(self)
     self.accepted.connect(self.save_list)
     self.main_window = main_window
     self.main_window.setStatusTip("")
-    self.removed_words = []
-    self.word_edits = []
-    self.scores = []
-
-    for index in range(len(CONTEXT.collection)):
-      self.ui.words_list.addWidget(QLabel(str(index)), index, 0)
-      self.word_edits.append([])
-      for i in range(2):
-        word_edit = QLineEdit()
-        self.word_edits[-1].append(word_edit)
-        self.ui.words_list.addWidget(word_edit, index, i + 1)
-      self.scores.append(QLabel())
-      self.ui.words_list.addWidget(self.scores[-1], index, 3)
-      remove_button = QPushButton("Удалить")
-      def gen_remove_callback(dialog, idx):
-        def remove_item():
-          updated_idx = idx
-          for i in sorted(dialog.removed_words):
-            if updated_idx >= i:
-              updated_idx += 1
-          dialog.removed_words.append(updated_idx)
-          dialog.rerender()
-        return remove_item
-      remove_button.clicked.connect(gen_remove_callback(self, index))
-      self.ui.words_list.addWidget(remove_button, index, 4)
-
-    self.rerender()
+    self.model = WordsTableModel()
+    self.ui.words_table.setModel(self.model)
+    self.ui.words_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    self.ui.words_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+    self.ui.words_table.horizontalHeader().setStretchLastSection(True)
+    self.ui.words_table.clicked.connect(self.on_table_click)
+    remove_action = QAction("Удалить", self)
+    remove_action.setShortcut(QKeySequence.Delete)
+    remove_action.triggered.connect(self.remove_selected)
+    self.ui.words_table.addAction(remove_action)
+    self.model.rowsRemoved.connect(self.update_label)
+    self.update_label()
+
+  def on_table_click(self, model_index):
+    if model_index.column() == WordsTableModel.REMOVE_COLUMN:
+      self.model.remove_row(model_index.row())
+
+  def remove_selected(self):
+    rows = {model_index.row() for model_index in self.ui.words_table.selectionModel().selectedRows()}
+    for row in sorted(rows, reverse=True):
+      self.model.remove_row(row)
 
   def save_list(self):
     self.main_window.setStatusTip(f"Список {CONTEXT.active_list_name} сохранён.")
-    new_collection = []
-    row = 0
-    for index, word in enumerate(CONTEXT.collection):
-      if index in self.removed_words:
-        continue
-      new_collection.append(word)
-      for i in range(2):
-        new_collection[-1]["words"][i] = (
-          self.ui.words_list.itemAtPosition(row, i + 1).widget().text()
-        )
-      row += 1
-    CONTEXT.collection = new_collection
+    for index, words in sorted(self.model.edits.items()):
+      if words != list(CONTEXT.collection.words(index)):
+        CONTEXT.collection.set_words(index, words)
+        CONTEXT.record_change({"op": "edit", "index": index, "words": words})
+    for index in sorted(self.model.removed, reverse=True):
+      del CONTEXT.collection[index]
+      CONTEXT.record_change({"op": "delete", "index": index})
+    CONTEXT.invalidate_scheduler()
     CONTEXT.dump_list()
+    CONTEXT.rebuild_word_index()
     reset_stats()
     update_menu_state(self.main_window)
     render_buttons()
 
-  def rerender(self):
+  def update_label(self):
     self.ui.label.setText(
       f"Список {CONTEXT.active_list_name} содержит "
-      + f"{len(CONTEXT.collection) - len(self.removed_words)} слов"
+      + f"{self.model.rowCount()} слов"
     )
-    for i in reversed(range(len(CONTEXT.collection) - len(self.removed_words), self.ui.words_list.rowCount())):
-      for j in reversed(range(self.ui.words_list.columnCount())):
-        index = self.ui.words_list.indexOf(self.ui.words_list.itemAtPosition(i, j))
-        if item := self.ui.words_list.takeAt(index):
-          widget = item.widget()
-          self.ui.words_list.removeWidget(widget)
-          widget.deleteLater()
-          del item
-    row = 0
-    for index, word in enumerate(CONTEXT.collection):
-      if index in self.removed_words:
-        continue
-      for i in range(2):
-        self.word_edits[row][i].setText(word["words"][i])
-      self.scores[row].setText(str(word["score"]) + "/" + str(word.get("spelling_score", 0)))
-      row += 1
 
 
 class FinishTrainDialog(QDialog):
+  @instrumentation.timed("FinishTrainDialog")
   def __init__(self):
     super(FinishTrainDialog, self).__init__()
+    import ui_train_finish
     self.ui = ui_train_finish.Ui_Dialog()
     self.ui.setupUi(self)
     self.finished.connect(self.finish_train)
@@ -465,20 +906,23 @@ class FinishTrainDialog(QDialog):
     self.ui.train_time.setText(
       str(datetime.datetime.now() - CONTEXT.train_start).split(".", maxsplit=1)[0]
     )
-    self.ui.learned_count.setText(
-      str(len([x for x in range(len(CONTEXT.collection)) if CONTEXT.is_trained_word(x)]))
-    )
+    self.ui.learned_count.setText(str(CONTEXT.learned_count))
 
   def finish_train(self):
     CONTEXT.dump_list()
-    remote_sync_file(CONTEXT.active_list_path.relative_to(os.getcwd()))
+    for path in CONTEXT.list_files:
+      remote_sync_file(path.relative_to(os.getcwd()))
+    CONTEXT.stats.finish_session("cards", CONTEXT.learned_count)
+    instrumentation.session_finished()
     reset_stats()
     render_buttons()
 
 
 class SpellingTrainDialog(QDialog):
+  @instrumentation.timed("SpellingTrainDialog")
   def __init__(self, main_window):
     super(SpellingTrainDialog, self).__init__()
+    import ui_spelling_task
     self.ui = ui_spelling_task.Ui_Dialog()
     self.ui.setupUi(self)
     self.main_window = main_window
@@ -489,60 +933,45 @@ class SpellingTrainDialog(QDialog):
     self.ui.answer_field.textChanged.connect(self.check_if_input_is_empty)
     self.ui.continue_button.setEnabled(False)
     self.ui.answer_field.setEnabled(False)
-    words = [
-      idx for idx in range(len(CONTEXT.collection))
-      if not CONTEXT.is_spelling_trained_word(idx)
-    ][:SETTINGS.spelling.active_pool_size]
-    words += [
-      idx for idx in range(len(CONTEXT.collection))
-      if CONTEXT.is_spelling_trained_word(idx)
-    ]
-    weights = [
-      1 if not CONTEXT.is_spelling_trained_word(idx) else
-        0.5 * (0.95 ** (CONTEXT.collection[idx].get("spelling_score") / SETTINGS.spelling.repetitions_to_train))
-      for idx in words
-    ]
-    sum_of_trainded_weights = sum([0 if weight == 1 else weight for weight in weights]) / SETTINGS.spelling.active_pool_size
-    if sum_of_trainded_weights < 1:
-      sum_of_trainded_weights = 1
-    weights = [1 if weight == 1 else weight / sum_of_trainded_weights for weight in weights]
-    self.words_to_check = random.choices(words, weights, k=SETTINGS.spelling.train_length)
-    self.remove_current_word = False
-    if greek_pattern.search(CONTEXT.collection[self.words_to_check[0]]["words"][0]):
-      self.ref_idx = 1
-      self.ans_idx = 0
-    elif greek_pattern.search(CONTEXT.collection[self.words_to_check[1]]["words"][1]):
-      self.ref_idx = 0
-      self.ans_idx = 1
-    elif english_pattern.search(CONTEXT.collection[self.words_to_check[0]]["words"][0]):
+    import scheduler
+    words_to_check = scheduler.draw_words(
+      CONTEXT.collection.spelling_score,
+      SETTINGS.spelling,
+      SETTINGS.spelling.train_length,
+      CONTEXT.untrained_pool(SETTINGS.spelling, "spelling_score"),
+    )
+    self.queue = scheduler.SpellingQueue(words_to_check, SETTINGS.spelling.retry_distance)
+    CONTEXT.auto_correction()
+    first, second = scripts.tag_scripts(CONTEXT.collection.tags[words_to_check[0]])
+    if scripts.foreignness(first) > scripts.foreignness(second):
       self.ref_idx = 1
       self.ans_idx = 0
     else:
       self.ref_idx = 0
       self.ans_idx = 1
+    self.answers = {
+      idx: normalize_word(CONTEXT.collection.words(idx)[self.ans_idx]) for idx in words_to_check
+    }
+    CONTEXT.stats.start_session("spelling")
+    instrumentation.session_started()
+    self.finished.connect(lambda: CONTEXT.stats.finish_session("spelling"))
+    self.finished.connect(instrumentation.session_finished)
     self.next_word()
 
   def check_if_input_is_empty(self):
     self.ui.check_answer_button.setEnabled(self.ui.answer_field.text() != "")
 
   def check_answer(self):
-    self.ui.answer.setText(CONTEXT.collection[self.words_to_check[0]]["words"][self.ans_idx])
-    def normalize_word(word):
-      normalized_str = unicodedata.normalize('NFD', word.strip().lower())
-      filtered_str = ''.join(char for char in normalized_str if not unicodedata.combining(char))
-      return filtered_str
-
+    word = self.queue.current
+    self.ui.answer.setText(CONTEXT.collection[word]["words"][self.ans_idx])
     user_answer = normalize_word(self.ui.answer_field.text())
-    correct_answer = normalize_word(CONTEXT.collection[self.words_to_check[0]]["words"][self.ans_idx])
+    correct_answer = self.answers[word]
     is_correct = user_answer == correct_answer
-    self.remove_current_word = is_correct
-    item_to_modify = CONTEXT.collection[self.words_to_check[0]]
     self.ui.answer.setStyleSheet("color: green" if is_correct else "color: red")
-    if is_correct:
-      item_to_modify["spelling_score"] = item_to_modify.get("spelling_score", 0) + 1
-    else:
-      item_to_modify["spelling_score"] = item_to_modify.get("spelling_score", 0) - 1
-    if len(self.words_to_check) == 1 and self.remove_current_word:
+    CONTEXT.change_score(word, 1 if is_correct else -1, "spelling_score")
+    CONTEXT.stats.record_answer("spelling", CONTEXT.collection.words(word)[0], is_correct)
+    self.queue.answer(is_correct)
+    if not self.queue:
       self.ui.continue_button.clicked.disconnect()
       self.ui.continue_button.clicked.connect(self.finish_train)
       self.ui.continue_button.setText("Завершить")
@@ -551,11 +980,7 @@ class SpellingTrainDialog(QDialog):
     self.ui.answer_field.setEnabled(False)
 
   def next_word(self):
-    if self.remove_current_word:
-      self.words_to_check = self.words_to_check[1:]
-    else:
-      self.words_to_check = self.words_to_check[1:] + [self.words_to_check[0]]
-    self.ui.word_to_translate.setText(CONTEXT.collection[self.words_to_check[0]]["words"][self.ref_idx])
+    self.ui.word_to_translate.setText(CONTEXT.collection[self.queue.next()]["words"][self.ref_idx])
     self.ui.answer_field.setText("")
     self.ui.answer.setText("")
     self.ui.answer_field.setEnabled(True)
@@ -563,23 +988,29 @@ class SpellingTrainDialog(QDialog):
 
   def finish_train(self):
     CONTEXT.dump_list()
-    remote_sync_file(CONTEXT.active_list_path.relative_to(os.getcwd()))
+    for path in CONTEXT.list_files:
+      remote_sync_file(path.relative_to(os.getcwd()))
     self.close()
 
 
 def can_modify_list():
-  return CONTEXT.has_list
+  return CONTEXT.has_list and not CONTEXT.loading
 
 
 def can_start_train():
-  return (CONTEXT.has_list and len(CONTEXT.collection) >= CARDS_COUNT)
+  return (CONTEXT.has_list and len(CONTEXT.collection) >= CARDS_COUNT and CONTEXT.ready_to_train)
+
+
+def can_start_spelling():
+  return can_start_train() and not CONTEXT.loading
 
 
 def update_menu_state(main_window):
   main_window.ui.add_word.setVisible(can_modify_list())
   main_window.ui.start_train.setVisible(can_start_train())
   main_window.ui.change_list.setVisible(can_modify_list())
-  main_window.ui.spelling_train.setVisible(can_start_train())
+  main_window.ui.spelling_train.setVisible(can_start_spelling())
+  main_window.ui.show_stats.setVisible(can_modify_list())
 
 
 def reset_stats():
@@ -587,14 +1018,18 @@ def reset_stats():
 
 
 def start_train():
+  CONTEXT.stats.start_session("cards")
+  instrumentation.session_started()
   reset_stats()
   fill_cards()
   CONTEXT.train_start = datetime.datetime.now()
 
 
 class SettingsDialog(QDialog):
+  @instrumentation.timed("SettingsDialog")
   def __init__(self):
     super(SettingsDialog, self).__init__()
+    import ui_settings
     self.ui = ui_settings.Ui_Dialog()
     self.ui.setupUi(self)
     layout = QVBoxLayout()
@@ -615,8 +1050,10 @@ class SettingsDialog(QDialog):
     self.finished.connect(save_settings)
 
 class NetSettingsDialog(QDialog):
+  @instrumentation.timed("NetSettingsDialog")
   def __init__(self):
     super(NetSettingsDialog, self).__init__()
+    import ui_net_settings
     self.ui = ui_net_settings.Ui_NetSettings()
     self.ui.setupUi(self)
     self.ui.ip.setText(NET_SETTINGS.ip)
@@ -626,9 +1063,144 @@ class NetSettingsDialog(QDialog):
     self.accepted.connect(save_net_settings)
 
 
+class SyncNotifier(QObject):
+  settings_synced = Signal()
+  list_synced = Signal(str)
+  upload_status = Signal(str, str)
+
+
+def prepare_loaded_batch(records):
+  # Orientation, script tags and index keys depend on the words alone, so the loader thread computes them.
+  # Records tagged when the list was saved keep their orientation and tag.
+  untagged = [record for record in records if record.get("tag", UNTAGGED) == UNTAGGED]
+  for record in untagged:
+    swap, tag = scripts.classify(record["words"])
+    if swap:
+      record["words"] = record["words"][::-1]
+    record["tag"] = tag
+  keys = [[normalize_word(word) for word in record["words"]] for record in records]
+  return records, keys, len(untagged)
+
+
+class ListLoader(QObject):
+  batch_loaded = Signal(object)
+  loaded = Signal()
+  failed = Signal(str)
+
+  def __init__(self, list_storage):
+    super().__init__()
+    self.storage = list_storage
+    self.cancelled = threading.Event()
+    # Back-pressure: the reader stays at most a few batches ahead of the GUI thread.
+    self.free_slots = threading.Semaphore(MAX_PENDING_BATCHES)
+
+  def start(self):
+    executor.submit(self.run)
+
+  def cancel(self):
+    self.cancelled.set()
+
+  def batch_consumed(self):
+    self.free_slots.release()
+
+  def run(self):
+    try:
+      for records in self.storage.stream(LOAD_BATCH_SIZE):
+        batch = prepare_loaded_batch(records)
+        while not self.free_slots.acquire(timeout=0.1):
+          if self.cancelled.is_set():
+            return
+        if self.cancelled.is_set():
+          return
+        self.batch_loaded.emit(batch)
+    except (OSError, ValueError, sqlite3.Error) as error:
+      self.failed.emit(str(error))
+      return
+    self.loaded.emit()
+
+
+UPLOAD_STATUS_MESSAGES = {
+  sync.UploadQueue.PENDING: "{} ожидает загрузки",
+  sync.UploadQueue.UPLOADING: "Загрузка {}...",
+  sync.UploadQueue.DONE: "{} загружен",
+  sync.UploadQueue.FAILED: "Не удалось загрузить {}",
+}
+
+
+class SearchDialog(QDialog):
+  search_index_updated = Signal()
+
+  @instrumentation.timed("SearchDialog")
+  def __init__(self):
+    super(SearchDialog, self).__init__()
+    self.setWindowTitle("Поиск по спискам")
+    self.resize(640, 480)
+    self.query = QLineEdit()
+    self.query.setPlaceholderText("Слово или перевод")
+    self.results = QListWidget()
+    self.status = QLabel("Обновление индекса...")
+    layout = QVBoxLayout()
+    layout.addWidget(self.query)
+    layout.addWidget(self.results)
+    layout.addWidget(self.status)
+    self.setLayout(layout)
+    self.query.textChanged.connect(self.search)
+    self.search_index_updated.connect(self.search)
+    refresh_search_index(self.search_index_updated.emit)
+
+  def search(self):
+    text = self.query.text()
+    found = get_search_index().search(text)
+    if found is None:
+      self.status.setText("Индекс обновляется, результаты появятся позже.")
+      return
+    self.results.clear()
+    self.results.addItems([f"{result.words[0]} — {result.words[1]} ({result.list_name})" for result in found])
+    if not text.strip():
+      self.status.setText(f"Списков в индексе: {len(get_search_index().lists)}")
+    elif found:
+      self.status.setText(f"Найдено: {len(found)}")
+    else:
+      self.status.setText("Ничего не найдено.")
+
+
+class StatsDialog(QDialog):
+  @instrumentation.timed("StatsDialog")
+  def __init__(self):
+    super(StatsDialog, self).__init__()
+    self.setWindowTitle(f"Статистика: {CONTEXT.active_list_name}")
+    self.resize(640, 480)
+    text = QPlainTextEdit()
+    text.setReadOnly(True)
+    text.setPlainText(stats.report(CONTEXT.stats))
+    layout = QVBoxLayout()
+    layout.addWidget(text)
+    self.setLayout(layout)
+
+
+class LatencyDialog(QDialog):
+  @instrumentation.timed("LatencyDialog")
+  def __init__(self):
+    super(LatencyDialog, self).__init__()
+    self.setWindowTitle("Задержки интерфейса")
+    self.resize(640, 480)
+    text = QPlainTextEdit()
+    text.setReadOnly(True)
+    text.setPlainText(latency.report(stall_watchdog) or "Нет измерений.")
+    layout = QVBoxLayout()
+    layout.addWidget(text)
+    self.setLayout(layout)
+
+
 class App(QMainWindow):
   def __init__(self):
     super(App, self).__init__()
+    self.sync_notifier = SyncNotifier()
+    self.sync_notifier.settings_synced.connect(self.reload_settings)
+    self.sync_notifier.list_synced.connect(self.reload_list)
+    self.sync_notifier.upload_status.connect(self.show_upload_status)
+    upload_queue.on_status = self.sync_notifier.upload_status.emit
+    self.list_loader = None
     self.ui = ui_main_window.Ui_MainWindow()
     self.ui.setupUi(self)
     self.ui.createList.triggered.connect(self.create_list)
@@ -639,27 +1211,70 @@ class App(QMainWindow):
     self.ui.spelling_train.triggered.connect(lambda : SpellingTrainDialog(self).exec())
     self.ui.settings.triggered.connect(lambda : SettingsDialog().exec())
     self.ui.network_settings.triggered.connect(lambda : NetSettingsDialog().exec())
+    self.ui.profile_training.triggered.connect(self.profile_next_training)
+    self.ui.latency_report.triggered.connect(lambda : LatencyDialog().exec())
+    self.ui.show_stats.triggered.connect(lambda : StatsDialog().exec())
+    self.ui.search_words.triggered.connect(lambda : SearchDialog().exec())
     for index in range(CARDS_COUNT):
       for side in ["left", "right"]:
         button = QPushButton()
         button.setFixedHeight(100)
         buttons[side].append(button)
+        rendered_buttons[side].append((None, None))
         getattr(self.ui, side + "_side").addWidget(button)
         button.clicked.connect(on_button_click(side, index))
 
     update_menu_state(self)
 
+  def start_sync(self):
+    # Emitted from the executor thread, delivered on the GUI thread.
+    sync_in_background(self.sync_notifier.settings_synced.emit, self.sync_notifier.list_synced.emit)
+
+  def profile_next_training(self):
+    instrumentation.profile_next_session(
+      lambda path: self.ui.statusbar.showMessage(f"Профиль тренировки сохранён в {path}")
+    )
+    self.ui.statusbar.showMessage("Следующая тренировка будет профилирована.")
+
+  def show_upload_status(self, path, status):
+    self.ui.statusbar.showMessage(UPLOAD_STATUS_MESSAGES[status].format(path), 5000)
+
+  def reload_settings(self):
+    apply_settings(load_settings())
+    update_menu_state(self)
+    self.setStatusTip("Настройки синхронизированы.")
+
+  def reload_list(self, list_path):
+    # A newer copy of the list or its journal arrived from the server; never swap it under a
+    # running training or unsaved edits.
+    if not CONTEXT.has_list or pathlib.Path(list_path) not in CONTEXT.list_files:
+      return
+    if CONTEXT.loading or CONTEXT.active_words or CONTEXT.pending_changes or CONTEXT.score_deltas:
+      return
+    CONTEXT.load_list()
+    update_menu_state(self)
+    self.setStatusTip(f"Список {CONTEXT.active_list_name} синхронизирован.")
+    self.report_stale_journal()
+
+  def report_stale_journal(self):
+    stale_journal_path = CONTEXT.storage.stale_journal_path
+    if stale_journal_path is not None:
+      self.ui.statusbar.showMessage(
+        f"Изменения, сделанные к другой версии списка, сохранены в {stale_journal_path.name} и не применены."
+      )
+
   def create_list(self):
     self.setToolTip("")
     dialog = QFileDialog()
     dialog.setAcceptMode(QFileDialog.AcceptMode.AcceptSave)
-    dialog.setNameFilter("JSON files (*.json)")
+    dialog.setNameFilter(storage.LIST_NAME_FILTER)
     if dialog.exec():
       list_path = pathlib.Path(dialog.selectedFiles()[0])
       try:
         if list_path.exists():
           self.setStatusTip(f"Список {list_path} уже существует.")
           return
+        self.cancel_loading()
         CONTEXT.active_list_path = list_path
         CONTEXT.dump_list()
         self.setStatusTip(f"Список {CONTEXT.active_list_name} создан.")
@@ -670,20 +1285,125 @@ class App(QMainWindow):
     self.setToolTip("")
     dialog = QFileDialog()
     dialog.setFileMode(QFileDialog.ExistingFile)
-    dialog.setNameFilter("JSON files (*.json)")
+    dialog.setNameFilter(storage.LIST_NAME_FILTER)
     if dialog.exec():
+      self.cancel_loading()
       CONTEXT.active_list_path = pathlib.Path(dialog.selectedFiles()[0])
       self.setToolTip(f"Выбран список {CONTEXT.active_list_name}.")
-      CONTEXT.load_list()
-      update_menu_state(self)
-      local_sync_file(CONTEXT.active_list_path.relative_to(os.getcwd()))
+      list_storage = CONTEXT.storage
+      if CONTEXT.active_list_path.stat().st_size >= STREAM_MIN_BYTES:
+        self.stream_list(list_storage)
+      else:
+        CONTEXT.load_list()
+        self.list_opened()
+
+  def stream_list(self, list_storage):
+    CONTEXT.begin_loading()
+    update_menu_state(self)
+    self.list_loader = ListLoader(list_storage)
+    self.list_loader.batch_loaded.connect(self.add_loaded_batch)
+    self.list_loader.loaded.connect(self.finish_loading)
+    self.list_loader.failed.connect(self.loading_failed)
+    self.ui.statusbar.showMessage(f"Загрузка списка {CONTEXT.active_list_name}...")
+    self.list_loader.start()
+
+  def cancel_loading(self):
+    if self.list_loader is not None:
+      self.list_loader.cancel()
+      self.list_loader = None
+      CONTEXT.reset()
+      failure = self.save_loading_changes()
+      # The words read so far are only a prefix of the list.
+      CONTEXT.clear_list()
+      render_buttons()
+      if failure:
+        self.ui.statusbar.showMessage(failure)
+
+  def save_loading_changes(self):
+    # Returns why the answers given while the list was loading were lost, if they were.
+    changes_count = len(CONTEXT.pending_changes) + len(CONTEXT.score_deltas)
+    try:
+      CONTEXT.save_loading_changes()
+    except (OSError, ValueError, sqlite3.Error) as error:
+      return f"Не удалось сохранить {changes_count} изменений списка {CONTEXT.active_list_name}: {error}"
+    return ""
+
+  def sent_by_loader(self):
+    # The sender of a signal queued by a loader that is gone by now is None.
+    return self.list_loader is not None and self.sender() is self.list_loader
+
+  def add_loaded_batch(self, batch):
+    # Batches of a cancelled loader may still be queued.
+    if not self.sent_by_loader():
+      return
+    CONTEXT.extend_loaded(*batch)
+    self.list_loader.batch_consumed()
+    update_menu_state(self)
+    self.ui.statusbar.showMessage(f"Загрузка списка {CONTEXT.active_list_name}: {len(CONTEXT.collection)} слов...")
+
+  def finish_loading(self):
+    if not self.sent_by_loader():
+      return
+    self.list_loader = None
+    CONTEXT.finish_loading()
+    self.ui.statusbar.showMessage(f"Список {CONTEXT.active_list_name} загружен: {len(CONTEXT.collection)} слов.", 5000)
+    self.list_opened()
+
+  def loading_failed(self, message):
+    if not self.sent_by_loader():
+      return
+    self.list_loader = None
+    CONTEXT.reset()
+    failure = self.save_loading_changes()
+    CONTEXT.clear_list()
+    CONTEXT.active_list_path = None
+    render_buttons()
+    update_menu_state(self)
+    self.ui.statusbar.showMessage(" ".join(filter(None, [f"Не удалось загрузить список: {message}.", failure])))
+
+  def list_opened(self):
+    update_menu_state(self)
+    self.report_stale_journal()
+    list_path = str(CONTEXT.active_list_path)
+    pull_list_in_background(
+      [path.relative_to(os.getcwd()) for path in CONTEXT.list_files],
+      lambda: self.sync_notifier.list_synced.emit(list_path),
+    )
+
+
+def report_startup(stages):
+  loaded_modules = set(sys.modules)
+  started = STARTUP_STARTED
+  report = {}
+  for name, finished in stages:
+    report[f"{name}_seconds"] = round(finished - started, 4)
+    started = finished
+  report["total_seconds"] = round(stages[-1][1] - STARTUP_STARTED, 4)
+  report["lazy_modules_loaded"] = sorted(name for name in LAZY_MODULES + LAZY_DEPENDENCIES if name in loaded_modules)
+  print(json.dumps(report), file=sys.stderr)
 
 
 if __name__ == "__main__":
+  stages = [("imports", IMPORTS_FINISHED), ("module_init", time.perf_counter())]
   app = QApplication(sys.argv)
+  stages.append(("application", time.perf_counter()))
 
   window = App()
+  stages.append(("window", time.perf_counter()))
+  if "--startup-profile" in sys.argv:
+    latency.PaintProbe(window, lambda: report_startup(stages + [("first_paint", time.perf_counter())]))
   window.show()
+  window.start_sync()
+  # Index other lists once the window is up, not while it paints for the first time.
+  QTimer.singleShot(SEARCH_INDEX_DELAY_MS, refresh_search_index)
+  stall_watchdog = latency.StallWatchdog()
+  stall_watchdog.start()
 
   app.exec()
+  stall_watchdog.stop()
+  instrumentation.export()
+  upload_queue.on_status = None
+  upload_queue.close()
   executor.shutdown(wait=True)
+  if ssh is not None:
+    ssh.close()
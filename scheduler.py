@@ -0,0 +1,207 @@
+import collections
+import heapq
+import itertools
+import random
+
+import numpy
+
+
+rng = numpy.random.default_rng()
+
+
+def trained_weight(score, repetitions_to_train):
+  return 0.5 * (0.95 ** (score / repetitions_to_train))
+
+
+def word_weights(scores, settings):
+  scores = numpy.asarray(scores, dtype=numpy.float64)
+  trained = scores >= settings.repetitions_to_train
+  weights = numpy.where(trained, trained_weight(scores, settings.repetitions_to_train), 0.0)
+  return trained, weights
+
+
+def trained_count(scores, settings):
+  return int(numpy.count_nonzero(numpy.asarray(scores) >= settings.repetitions_to_train))
+
+
+def selection_probabilities(scores, settings, pool=None):
+  # pool: the first active_pool_size untrained words, when the storage already knows them.
+  trained, weights = word_weights(scores, settings)
+  if pool is None:
+    pool = numpy.flatnonzero(~trained)[:settings.active_pool_size]
+  pool = numpy.asarray(pool, dtype=numpy.int64)
+  trained_words = numpy.flatnonzero(trained)
+  normalisation = max(weights.sum() / settings.active_pool_size, 1)
+  words = numpy.concatenate([pool, trained_words])
+  probabilities = numpy.concatenate([
+    numpy.ones(len(pool)),
+    weights[trained_words] / normalisation,
+  ])
+  return words, probabilities / probabilities.sum()
+
+
+def draw_words(scores, settings, k, pool=None):
+  words, probabilities = selection_probabilities(scores, settings, pool)
+  return rng.choice(words, size=k, p=probabilities).tolist()
+
+
+class FenwickTree:
+  def __init__(self, size):
+    self.values = [0] * size
+    self.tree = [0] * (size + 1)
+
+  @classmethod
+  def from_values(cls, values):
+    values = numpy.asarray(values)
+    fenwick = cls(len(values))
+    prefix = numpy.concatenate([numpy.zeros(1, dtype=values.dtype), numpy.cumsum(values)])
+    positions = numpy.arange(1, len(values) + 1)
+    fenwick.values = values.tolist()
+    fenwick.tree = [0] + (prefix[positions] - prefix[positions - (positions & -positions)]).tolist()
+    return fenwick
+
+  def __len__(self):
+    return len(self.values)
+
+  def set(self, idx, value):
+    delta = value - self.values[idx]
+    if delta == 0:
+      return
+    self.values[idx] = value
+    idx += 1
+    while idx < len(self.tree):
+      self.tree[idx] += delta
+      idx += idx & -idx
+
+  def append(self, value):
+    # The new node covers (position - lowbit, position]; its earlier part is already in the tree.
+    self.values.append(value)
+    position = len(self.values)
+    covered_from = position - (position & -position)
+    self.tree.append(value + self.prefix_sum(position - 1) - self.prefix_sum(covered_from))
+
+  def prefix_sum(self, count):
+    result = 0
+    while count > 0:
+      result += self.tree[count]
+      count -= count & -count
+    return result
+
+  @property
+  def total(self):
+    return self.prefix_sum(len(self.values))
+
+  def find(self, value):
+    # Smallest index whose inclusive prefix sum exceeds value.
+    position = 0
+    step = 1 << (len(self.values).bit_length() - 1) if self.values else 0
+    while step:
+      following = position + step
+      if following < len(self.tree) and self.tree[following] <= value:
+        position = following
+        value -= self.tree[following]
+      step >>= 1
+    # Float drift in the partial sums may push us past the last weighted slot.
+    while position > 0 and (position >= len(self.values) or self.values[position] <= 0):
+      position -= 1
+    return position
+
+
+class WordScheduler:
+  def __init__(self, scores, settings):
+    self.repetitions_to_train = settings.repetitions_to_train
+    self.active_pool_size = settings.active_pool_size
+    self.scores = list(scores)
+    self.active = set()
+    trained, weights = word_weights(self.scores, settings)
+    self.untrained = FenwickTree.from_values((~trained).astype(numpy.int64))
+    self.trained = FenwickTree.from_values(weights)
+    self.trained_count = int(numpy.count_nonzero(weights))
+
+  def matches(self, settings):
+    return (
+      self.repetitions_to_train == settings.repetitions_to_train
+      and self.active_pool_size == settings.active_pool_size
+    )
+
+  def is_trained(self, score):
+    return score >= self.repetitions_to_train
+
+  def weight(self, score):
+    return trained_weight(score, self.repetitions_to_train)
+
+  def refresh(self, idx):
+    score = self.scores[idx]
+    was_weighted = self.trained.values[idx] > 0
+    if idx in self.active:
+      self.untrained.set(idx, 0)
+      self.trained.set(idx, 0)
+    elif self.is_trained(score):
+      self.untrained.set(idx, 0)
+      self.trained.set(idx, self.weight(score))
+    else:
+      self.untrained.set(idx, 1)
+      self.trained.set(idx, 0)
+    self.trained_count += (self.trained.values[idx] > 0) - was_weighted
+
+  def update_score(self, idx, score):
+    self.scores[idx] = score
+    self.refresh(idx)
+
+  def extend(self, scores):
+    # Words appended at the end of the collection, e.g. while a list is still loading.
+    for score in scores:
+      self.scores.append(score)
+      weight = self.weight(score) if self.is_trained(score) else 0.0
+      self.untrained.append(0 if self.is_trained(score) else 1)
+      self.trained.append(weight)
+      self.trained_count += weight > 0
+
+  def activate(self, idx):
+    self.active.add(idx)
+    self.refresh(idx)
+
+  def deactivate(self, idx):
+    self.active.discard(idx)
+    self.refresh(idx)
+
+  def select(self, rng=random):
+    # Same distribution as weighting the first active_pool_size untrained words
+    # with 1 and trained ones with their weight normalised to the pool size.
+    pool = min(self.untrained.total, self.active_pool_size)
+    # Partial float sums never return exactly to zero, so count weighted slots.
+    trained_sum = self.trained.total if self.trained_count else 0
+    normalisation = max(trained_sum / self.active_pool_size, 1)
+    if pool == 0 and trained_sum <= 0:
+      raise IndexError("No words to select from")
+    point = rng.random() * (pool + trained_sum / normalisation)
+    if point < pool:
+      return self.untrained.find(int(point))
+    return self.trained.find((point - pool) * normalisation)
+
+
+class SpellingQueue:
+  # Words are asked in order; a missed word comes back after retry_distance other words.
+  def __init__(self, words, retry_distance):
+    self.words = collections.deque(words)
+    self.retries = []
+    self.retry_distance = retry_distance
+    self.turn = 0
+    self.order = itertools.count()
+    self.current = None
+
+  def __len__(self):
+    return len(self.words) + len(self.retries) + (self.current is not None)
+
+  def next(self):
+    if self.retries and (self.retries[0][0] <= self.turn or not self.words):
+      self.current = heapq.heappop(self.retries)[2]
+    else:
+      self.current = self.words.popleft()
+    self.turn += 1
+    return self.current
+
+  def answer(self, correct):
+    if not correct:
+      heapq.heappush(self.retries, (self.turn + self.retry_distance, next(self.order), self.current))
+    self.current = None
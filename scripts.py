@@ -0,0 +1,87 @@
+import unicodedata
+
+
+# The learner's own script; words in any other script are the ones being learned.
+NATIVE_SCRIPT = "CYRILLIC"
+SCRIPTS = (
+  "",
+  "CYRILLIC",
+  "LATIN",
+  "GREEK",
+  "ARMENIAN",
+  "GEORGIAN",
+  "HEBREW",
+  "ARABIC",
+  "DEVANAGARI",
+  "THAI",
+  "HANGUL",
+  "HIRAGANA",
+  "KATAKANA",
+  "CJK",
+  "OTHER",
+)
+SCRIPT_IDS = {script: idx for idx, script in enumerate(SCRIPTS)}
+
+
+# Per-character memo; the alphabet of a word list is small, so it never grows large.
+CHAR_SCRIPTS = {}
+# (first script, second script) -> pair_class() result
+PAIR_CLASSES = {}
+# Which script names a word: the most foreign one, but a native letter beats no letter at all.
+SCRIPT_PRIORITY = {"": -1, NATIVE_SCRIPT: 0, "LATIN": 1}
+
+
+def char_script(char):
+  script = CHAR_SCRIPTS.get(char)
+  if script is None:
+    script = ""
+    if char.isalpha():
+      # Unicode character names start with the script, e.g. "GREEK SMALL LETTER ALPHA".
+      script = unicodedata.name(char, "").split(" ", 1)[0]
+      if script not in SCRIPT_IDS:
+        script = "OTHER"
+    CHAR_SCRIPTS[char] = script
+  return script
+
+
+def foreignness(script):
+  return max(SCRIPT_PRIORITY.get(script, 2), 0)
+
+
+def word_script(word):
+  if word.isascii():
+    # Cased ASCII characters are exactly the Latin letters.
+    return "LATIN" if word[:1].isalpha() or word.swapcase() != word else ""
+  result, result_priority = "", -1
+  for char in word:
+    script = char_script(char)
+    priority = SCRIPT_PRIORITY.get(script, 2)
+    if priority > result_priority:
+      result, result_priority = script, priority
+      if priority == 2:
+        break
+  return result
+
+
+def script_tag(first, second):
+  return SCRIPT_IDS[first] << 4 | SCRIPT_IDS[second]
+
+
+def tag_scripts(tag):
+  return SCRIPTS[tag >> 4], SCRIPTS[tag & 0xF]
+
+
+def pair_class(first, second):
+  # The more foreign word goes second; returns whether the pair has to be swapped and its tag.
+  swap = foreignness(first) > foreignness(second)
+  if swap:
+    first, second = second, first
+  return swap, script_tag(first, second)
+
+
+def classify(words):
+  scripts = (word_script(words[0]), word_script(words[1]))
+  result = PAIR_CLASSES.get(scripts)
+  if result is None:
+    result = PAIR_CLASSES[scripts] = pair_class(*scripts)
+  return result
@@ -0,0 +1,251 @@
+import base64
+import dataclasses
+import json
+import math
+import os
+import pathlib
+import sqlite3
+import threading
+from array import array
+
+import numpy
+
+import instrumentation
+import storage
+
+
+INDEX_FILENAME = ".search_index.json"
+INDEX_VERSION = 1
+LIST_SUFFIXES = (".json",) + storage.SQLITE_SUFFIXES
+# Files next to the lists that share their suffixes but are not word lists.
+IGNORED_FILENAMES = {"settings.json", "network.json"}
+IGNORED_FOLDERS = {instrumentation.PROFILES_FOLDER, "__pycache__"}
+MIN_SIMILARITY = 0.5
+MAX_SCANNED = 20000
+LOOKUP_TIMEOUT = 0.05
+EMPTY_POSTING = array("I")
+
+
+@dataclasses.dataclass
+class SearchResult:
+  similarity: float
+  list_name: str
+  words: tuple
+
+
+def grams(key):
+  padded = f"${key}$"
+  return {padded[idx:idx + 3] for idx in range(len(padded) - 2)}
+
+
+def fingerprint(path):
+  result = []
+  for file in storage.open_storage(path).files:
+    try:
+      stat = file.stat()
+    except FileNotFoundError:
+      continue
+    result.append([file.name, stat.st_mtime_ns, stat.st_size])
+  return result
+
+
+class SearchIndex:
+  # Trigram index over the words of every list in a folder. Each word of a pair is a
+  # term with id 2 * entry + side; entries of lists that changed stay as dead slots
+  # until the next compaction.
+  def __init__(self, folder, normalize):
+    self.folder = pathlib.Path(folder)
+    self.path = self.folder / INDEX_FILENAME
+    self.normalize = normalize
+    self.lock = threading.Lock()
+    self.loaded = False
+    self.clear()
+
+  def clear(self):
+    # list name -> {"fingerprint": [...], "start": first entry, "count": entries}
+    self.lists = {}
+    self.entries = []
+    self.sources = []
+    self.postings = {}
+    # Number of distinct grams of every term, capped to a byte.
+    self.sizes = array("B")
+    self.dead = 0
+
+  def list_name(self, path):
+    return pathlib.Path(os.path.relpath(path, self.folder)).as_posix()
+
+  def scan(self):
+    ignored = {(self.folder / name).resolve() for name in IGNORED_FILENAMES}
+    if instrumentation.output_path:
+      ignored.add(pathlib.Path(instrumentation.output_path).resolve())
+    found = {}
+    for root, folders, files in os.walk(self.folder):
+      folders[:] = [name for name in folders if not name.startswith(".") and name not in IGNORED_FOLDERS]
+      for name in files:
+        path = pathlib.Path(root) / name
+        if name.startswith(".") or path.suffix.lower() not in LIST_SUFFIXES:
+          continue
+        if path.resolve() in ignored:
+          continue
+        found[self.list_name(path)] = fingerprint(path)
+    return found
+
+  def read_list(self, name):
+    try:
+      return [tuple(words) for words in storage.read_words(self.folder / name)]
+    except (OSError, ValueError, TypeError, KeyError, IndexError, sqlite3.Error):
+      # Not a word list; remembered empty until the file changes.
+      return []
+
+  def load(self):
+    try:
+      with self.path.open("r", encoding="utf-8") as fin:
+        data = json.loads(fin.read())
+    except (OSError, ValueError):
+      return
+    if data.get("version") != INDEX_VERSION:
+      return
+    self.lists = data["lists"]
+    self.entries = [tuple(words) for words in data["entries"]]
+    self.sources = [None] * len(self.entries)
+    for name, info in self.lists.items():
+      self.sources[info["start"]:info["start"] + info["count"]] = [name] * info["count"]
+    self.dead = self.sources.count(None)
+    self.postings = {}
+    for gram, encoded in data["postings"].items():
+      terms = array("I")
+      terms.frombytes(base64.b64decode(encoded))
+      self.postings[gram] = terms
+    self.sizes = array("B", base64.b64decode(data["sizes"]))
+
+  def save(self):
+    with self.lock:
+      data = {
+        "version": INDEX_VERSION,
+        "lists": self.lists,
+        "entries": self.entries,
+        "sizes": base64.b64encode(self.sizes).decode("ascii"),
+        "postings": {
+          gram: base64.b64encode(terms.tobytes()).decode("ascii")
+          for gram, terms in self.postings.items()
+        },
+      }
+    temporary_path = self.path.with_name(self.path.name + ".part")
+    with temporary_path.open("w", encoding="utf-8") as fout:
+      fout.write(json.dumps(data, ensure_ascii=False))
+    os.replace(temporary_path, self.path)
+
+  def add_entries(self, name, words_list):
+    start = len(self.entries)
+    postings = self.postings
+    for entry, words in enumerate(words_list, start):
+      for side, word in enumerate(words):
+        word_grams = grams(self.normalize(word))
+        self.sizes.append(min(len(word_grams), 255))
+        for gram in word_grams:
+          terms = postings.get(gram)
+          if terms is None:
+            terms = postings[gram] = array("I")
+          terms.append(2 * entry + side)
+    self.entries += words_list
+    self.sources += [name] * len(words_list)
+    return start
+
+  def drop_list(self, name):
+    info = self.lists.pop(name)
+    self.sources[info["start"]:info["start"] + info["count"]] = [None] * info["count"]
+    self.dead += info["count"]
+
+  def compact(self):
+    live = [(name, self.entries[info["start"]:info["start"] + info["count"]]) for name, info in self.lists.items()]
+    lists = self.lists
+    self.clear()
+    for name, words_list in live:
+      lists[name]["start"] = self.add_entries(name, words_list)
+    self.lists = lists
+
+  @instrumentation.timed("search_index_refresh")
+  def refresh(self):
+    # Runs off the GUI thread; only lists whose files changed are read again.
+    if not self.loaded:
+      with self.lock:
+        self.load()
+        self.loaded = True
+    found = self.scan()
+    changed = [name for name, files in found.items() if self.lists.get(name, {}).get("fingerprint") != files]
+    removed = [name for name in self.lists if name not in found]
+    if not changed and not removed:
+      return False
+    read = {name: self.read_list(name) for name in changed}
+    with self.lock:
+      for name in removed + changed:
+        if name in self.lists:
+          self.drop_list(name)
+      for name in changed:
+        start = self.add_entries(name, read[name])
+        self.lists[name] = {"fingerprint": found[name], "start": start, "count": len(read[name])}
+      if self.dead > len(self.entries) - self.dead:
+        self.compact()
+    self.save()
+    return True
+
+  def ranked_terms(self, query_grams, needed):
+    # A term holding `needed` of the query grams holds one of the len - needed + 1
+    # rarest ones, so only their postings are merged. Postings are sorted, so the
+    # remaining grams are counted by bisection. Past MAX_SCANNED terms the common
+    # grams only rank candidates and very generic queries rank a sample.
+    postings = sorted(
+      (numpy.frombuffer(self.postings.get(gram, EMPTY_POSTING), numpy.uint32) for gram in query_grams),
+      key=len,
+    )
+    probe = []
+    scanned = 0
+    for terms in postings[:len(postings) - needed + 1]:
+      if scanned and scanned + len(terms) > MAX_SCANNED:
+        break
+      probe.append(terms)
+      scanned += len(terms)
+    if not scanned:
+      return [], []
+    terms, hits = numpy.unique(numpy.concatenate(probe), return_counts=True)
+    terms, hits = terms[:MAX_SCANNED], hits[:MAX_SCANNED]
+    for gram_terms in postings[len(probe):]:
+      positions = numpy.minimum(numpy.searchsorted(gram_terms, terms), len(gram_terms) - 1)
+      hits += gram_terms[positions] == terms
+    keep = hits >= needed
+    terms, hits = terms[keep], hits[keep]
+    # Best coverage of the query first, then the shortest terms.
+    order = numpy.lexsort((terms, numpy.frombuffer(self.sizes, numpy.uint8)[terms], -hits))
+    return terms[order].tolist(), hits[order].tolist()
+
+  def lookup(self, word, exclude, limit, exact):
+    key = self.normalize(word)
+    if not key:
+      return []
+    query_grams = grams(key)
+    needed = len(query_grams) if exact else max(1, math.ceil(MIN_SIMILARITY * len(query_grams)))
+    terms, hits = self.ranked_terms(query_grams, needed)
+    results = []
+    seen = set()
+    for term, hit in zip(terms, hits):
+      entry, side = divmod(term, 2)
+      list_name = self.sources[entry]
+      if list_name is None or list_name == exclude or entry in seen:
+        continue
+      if exact and self.normalize(self.entries[entry][side]) != key:
+        continue
+      seen.add(entry)
+      results.append(SearchResult(hit / len(query_grams), list_name, self.entries[entry]))
+      if len(results) >= limit:
+        break
+    return results
+
+  @instrumentation.timed("search_index_lookup")
+  def search(self, word, exclude=None, limit=50, exact=False):
+    # None means the index is being updated right now; the GUI never waits for it.
+    if not self.lock.acquire(timeout=LOOKUP_TIMEOUT):
+      return None
+    try:
+      return self.lookup(word, exclude, limit, exact)
+    finally:
+      self.lock.release()
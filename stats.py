@@ -0,0 +1,169 @@
+import datetime
+import heapq
+import json
+import os
+import pathlib
+import struct
+import time
+import zlib
+
+
+STATS_SUFFIX = ".stats"
+SUMMARY_SUFFIX = ".stats.summary"
+# time, kind, exercise, value, word key
+EVENT = struct.Struct("<IBBiI")
+ANSWER = 0
+SESSION_START = 1
+SESSION_END = 2
+EXERCISES = ("cards", "spelling")
+HARDEST_MIN_ANSWERS = 3
+
+
+def log_path(list_path):
+  list_path = pathlib.Path(list_path)
+  return list_path.with_name(list_path.name + STATS_SUFFIX)
+
+
+def summary_path(list_path):
+  list_path = pathlib.Path(list_path)
+  return list_path.with_name(list_path.name + SUMMARY_SUFFIX)
+
+
+def word_key(word):
+  return zlib.crc32(word.encode("utf-8"))
+
+
+def empty_summary():
+  return {
+    "offset": 0,
+    # day -> [answers, correct, sessions, session seconds]
+    "days": {},
+    # day -> learned words at the last finished cards session
+    "learned": {},
+    # word key -> [answers, errors]
+    "words": {},
+    "names": {},
+    # exercise -> start time of the session in progress
+    "open_sessions": {},
+  }
+
+
+def day_of(timestamp):
+  return datetime.date.fromtimestamp(timestamp).isoformat()
+
+
+def fold(summary, timestamp, kind, exercise, value, key):
+  day = summary["days"].setdefault(day_of(timestamp), [0, 0, 0, 0])
+  exercise = EXERCISES[exercise]
+  if kind == ANSWER:
+    day[0] += 1
+    day[1] += value > 0
+    word = summary["words"].setdefault(str(key), [0, 0])
+    word[0] += 1
+    word[1] += value <= 0
+  elif kind == SESSION_START:
+    summary["open_sessions"][exercise] = timestamp
+  elif kind == SESSION_END:
+    started = summary["open_sessions"].pop(exercise, None)
+    if started is not None:
+      day[2] += 1
+      day[3] += timestamp - started
+    if exercise == "cards":
+      summary["learned"][day_of(timestamp)] = value
+
+
+class StatsStore:
+  def __init__(self, list_path):
+    self.list_path = list_path
+    self.log_path = log_path(list_path)
+    self.summary_path = summary_path(list_path)
+    self.summary = self.load_summary()
+    self.catch_up()
+
+  def load_summary(self):
+    try:
+      with self.summary_path.open("r", encoding="utf-8") as fin:
+        return json.loads(fin.read())
+    except (OSError, ValueError):
+      return empty_summary()
+
+  def catch_up(self):
+    # Fold only the events appended since the summary was saved.
+    size = self.log_path.stat().st_size if self.log_path.exists() else 0
+    if size % EVENT.size:
+      # Torn record left by an interrupted append.
+      size -= size % EVENT.size
+      os.truncate(self.log_path, size)
+    if size < self.summary["offset"]:
+      # The log was replaced or truncated behind our back; rebuild from scratch.
+      names = self.summary["names"]
+      self.summary = empty_summary()
+      self.summary["names"] = names
+    if size == self.summary["offset"]:
+      return
+    with self.log_path.open("rb") as fin:
+      fin.seek(self.summary["offset"])
+      data = fin.read(size - self.summary["offset"])
+    for event in EVENT.iter_unpack(data):
+      fold(self.summary, *event)
+    self.summary["offset"] = size
+    self.save()
+
+  def save(self):
+    temporary_path = self.summary_path.with_name(self.summary_path.name + ".part")
+    with temporary_path.open("w", encoding="utf-8") as fout:
+      fout.write(json.dumps(self.summary, ensure_ascii=False))
+    os.replace(temporary_path, self.summary_path)
+
+  def append(self, kind, exercise, value=0, key=0):
+    event = (int(time.time()), kind, EXERCISES.index(exercise), value, key)
+    with self.log_path.open("ab") as fout:
+      fout.write(EVENT.pack(*event))
+    fold(self.summary, *event)
+    self.summary["offset"] += EVENT.size
+
+  def record_answer(self, exercise, word, correct):
+    key = word_key(word)
+    self.summary["names"][str(key)] = word
+    self.append(ANSWER, exercise, 1 if correct else -1, key)
+
+  def start_session(self, exercise):
+    self.append(SESSION_START, exercise)
+
+  def finish_session(self, exercise, learned=0):
+    if exercise not in self.summary["open_sessions"]:
+      return
+    self.append(SESSION_END, exercise, learned)
+    self.save()
+
+  def hardest_words(self, count=10):
+    words = (
+      (errors / answers, errors, self.summary["names"].get(key, key))
+      for key, (answers, errors) in self.summary["words"].items()
+      if answers >= HARDEST_MIN_ANSWERS and errors
+    )
+    return heapq.nlargest(count, words)
+
+
+def report(store, days=14):
+  summary = store.summary
+  answers = sum(day[0] for day in summary["days"].values())
+  correct = sum(day[1] for day in summary["days"].values())
+  if not answers:
+    return "Тренировок ещё не было."
+  lines = [f"Всего ответов: {answers}, верных {correct / answers:.0%}", "", "По дням:"]
+  for day in sorted(summary["days"], reverse=True)[:days]:
+    day_answers, day_correct, sessions, seconds = summary["days"][day]
+    line = f"{day}: ответов {day_answers}"
+    if day_answers:
+      line += f", верных {day_correct / day_answers:.0%}"
+    if sessions:
+      line += f", тренировок {sessions}, в среднем {datetime.timedelta(seconds=seconds // sessions)}"
+    if day in summary["learned"]:
+      line += f", выучено слов {summary['learned'][day]}"
+    lines.append(line)
+  hardest = store.hardest_words()
+  if hardest:
+    lines += ["", "Самые трудные слова:"]
+    lines += [f"{word}: ошибок {errors} ({share:.0%})" for share, errors, word in hardest]
+  return "\n".join(lines)
@@ -0,0 +1,393 @@
+import bisect
+import codecs
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import sys
+from array import array
+
+import journal
+from word_collection import UNTAGGED, WordCollection
+
+
+SQLITE_SUFFIXES = (".sqlite", ".db")
+LIST_NAME_FILTER = "Word lists (*.json *.sqlite *.db)"
+SCORE_FIELDS = ("score", "spelling_score")
+STREAM_CHUNK_SIZE = 1 << 20
+RECORD_SEPARATOR = re.compile(r"[\s,]*")
+
+
+def file_stat(path, stat=None):
+  try:
+    stat = stat or path.stat()
+  except FileNotFoundError:
+    return None
+  return (stat.st_mtime_ns, stat.st_size)
+
+
+def score_column(field):
+  if field not in SCORE_FIELDS:
+    raise ValueError(f"Unknown score field {field}")
+  return field
+
+
+class JsonStorage:
+  def __init__(self, path):
+    self.path = pathlib.Path(path)
+    self.journal_path = journal.journal_path(self.path)
+    self.snapshot_hash = None
+    # (mtime, size) of the snapshot and the journal as last read or written, to notice sync replacing them.
+    self.snapshot_stat = None
+    self.journal_stat = None
+    self.stale_journal_path = None
+    # Journal operations read at the end of stream(), replayed by the caller on the whole collection.
+    self.stream_operations = []
+
+  @property
+  def files(self):
+    return [self.path, self.journal_path]
+
+  def remember_stats(self, stat=None):
+    self.snapshot_stat = file_stat(self.path, stat)
+    self.journal_stat = file_stat(self.journal_path)
+
+  def can_append(self):
+    return self.path.exists() and self.snapshot_hash is not None
+
+  def load(self):
+    self.stale_journal_path = None
+    with self.path.open("rb") as fin:
+      self.remember_stats(os.fstat(fin.fileno()))
+      data = fin.read()
+    collection = WordCollection.from_records(json.loads(data.decode("utf-8")))
+    self.snapshot_hash = journal.snapshot_hash(data)
+    operations = journal.read_journal(self.journal_path, self.snapshot_hash)
+    if operations is None or not journal.fits(len(collection), operations):
+      self.stale_journal_path = journal.set_aside(self.journal_path)
+      self.journal_stat = None
+    else:
+      journal.replay(collection, operations)
+    return collection
+
+  def has_journal(self):
+    return self.journal_path.exists()
+
+  def stream(self, batch_size):
+    # Parses the snapshot array one record at a time, holding a single chunk of text.
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    hasher = journal.snapshot_hasher()
+    buffer = ""
+    position = 0
+    batch = []
+    count = 0
+    started = False
+    finished = False
+    self.stale_journal_path = None
+    self.stream_operations = []
+    with self.path.open("rb") as fin:
+      self.remember_stats(os.fstat(fin.fileno()))
+      while not finished:
+        chunk = fin.read(STREAM_CHUNK_SIZE)
+        hasher.update(chunk)
+        buffer = buffer[position:] + text_decoder.decode(chunk, final=not chunk)
+        position = 0
+        if not started:
+          if not buffer.strip() and chunk:
+            continue
+          if not buffer.lstrip().startswith("["):
+            raise ValueError(f"{self.path} is not a word list")
+          position = buffer.index("[") + 1
+          started = True
+        while True:
+          position = RECORD_SEPARATOR.match(buffer, position).end()
+          if buffer.startswith("]", position):
+            finished = True
+            break
+          try:
+            record, position = decoder.raw_decode(buffer, position)
+          except json.JSONDecodeError:
+            if not chunk:
+              raise
+            break
+          batch.append(record)
+          count += 1
+          if len(batch) >= batch_size:
+            yield batch
+            batch = []
+        if not chunk:
+          break
+      hasher.update(fin.read())
+    if batch:
+      yield batch
+    self.snapshot_hash = hasher.hexdigest()
+    # Operations refer to positions in the whole list, so they come after the last batch.
+    operations = journal.read_journal(self.journal_path, self.snapshot_hash)
+    if operations is None or not journal.fits(count, operations):
+      self.stale_journal_path = journal.set_aside(self.journal_path)
+      self.journal_stat = None
+    else:
+      self.stream_operations = operations
+
+  def append(self, operations, collection):
+    if operations and not self.journal_matches():
+      # Sync replaced the snapshot or its journal since the list was read; the operations
+      # refer to positions in the collection, not in the new files, so write it in full.
+      if self.journal_path.exists():
+        self.stale_journal_path = journal.set_aside(self.journal_path)
+      self.save(collection)
+      return
+    journal.append_journal(self.journal_path, self.snapshot_hash, operations)
+    if journal.needs_compaction(self.journal_path):
+      self.save(collection)
+    elif operations:
+      # Sync keeps the copy whose snapshot is newer, so the snapshot must not look older than its journal.
+      os.utime(self.path)
+      self.remember_stats()
+
+  def journal_matches(self):
+    if file_stat(self.journal_path) != self.journal_stat:
+      return False
+    if file_stat(self.path) != self.snapshot_stat:
+      # A copy with the same content, e.g. pulled back after an upload, only changes the stat.
+      if not self.path.exists() or journal.snapshot_hash(self.path.read_bytes()) != self.snapshot_hash:
+        return False
+      self.snapshot_stat = file_stat(self.path)
+    return journal.journal_hash(self.journal_path) in (None, self.snapshot_hash)
+
+  def save(self, collection):
+    data = json.dumps(collection.to_records()).encode("utf-8")
+    with self.path.open("wb") as fout:
+      fout.write(data)
+    self.snapshot_hash = journal.snapshot_hash(data)
+    self.journal_path.unlink(missing_ok=True)
+    self.remember_stats()
+
+
+class SqliteStorage:
+  SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS words ("
+    "  id INTEGER PRIMARY KEY,"
+    "  first TEXT NOT NULL,"
+    "  second TEXT NOT NULL,"
+    "  score INTEGER NOT NULL DEFAULT 0,"
+    "  spelling_score INTEGER NOT NULL DEFAULT 0,"
+    f"  tag INTEGER NOT NULL DEFAULT {UNTAGGED}"
+    ")",
+  ]
+  # Serve the duplicate lookup, the trained count and the untrained pool.
+  INDEXES = [
+    "CREATE INDEX IF NOT EXISTS words_first ON words(first)",
+    "CREATE INDEX IF NOT EXISTS words_second ON words(second)",
+    "CREATE INDEX IF NOT EXISTS words_score ON words(score)",
+    "CREATE INDEX IF NOT EXISTS words_spelling_score ON words(spelling_score)",
+  ]
+  # Columns added after the first release, created in older files on connect.
+  MIGRATIONS = {
+    "tag": f"ALTER TABLE words ADD COLUMN tag INTEGER NOT NULL DEFAULT {UNTAGGED}",
+  }
+
+  def __init__(self, path):
+    self.path = pathlib.Path(path)
+    self.connection = None
+    self.stale_journal_path = None
+    self.stream_operations = []
+    # Row positions map to ids. New ids are always above the current maximum,
+    # so the array stays sorted and positions can be found by bisection.
+    self.ids = array("q")
+
+  @property
+  def files(self):
+    return [self.path]
+
+  def can_append(self):
+    return self.path.exists() and self.connection is not None
+
+  def connect(self):
+    if self.connection is None:
+      self.connection = sqlite3.connect(self.path, check_same_thread=False)
+      with self.connection:
+        for statement in self.SCHEMA:
+          self.connection.execute(statement)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(words)")}
+        for column, statement in self.MIGRATIONS.items():
+          if column not in columns:
+            self.connection.execute(statement)
+        for statement in self.INDEXES:
+          self.connection.execute(statement)
+    return self.connection
+
+  def load(self):
+    # Every column comes back as one text value that is split and parsed in C; building a
+    # tuple per row took most of the loading time.
+    import numpy
+    try:
+      row = self.connect().execute(
+        "SELECT COUNT(*), group_concat(id), group_concat(first, char(31)), group_concat(second, char(31)),"
+        " group_concat(score), group_concat(spelling_score), group_concat(tag)"
+        " FROM (SELECT * FROM words ORDER BY id)"
+      ).fetchone()
+    except sqlite3.DataError:
+      # A column longer than SQLite's string limit.
+      return self.load_rows()
+    count, ids, firsts, seconds, scores, spelling_scores, tags = row
+    collection = WordCollection()
+    self.ids = array("q")
+    if not count:
+      return collection
+    ids, scores, spelling_scores, tags = (
+      numpy.fromstring(column, dtype=numpy.int64, sep=",") for column in (ids, scores, spelling_scores, tags)
+    )
+    firsts = firsts.split("\x1f")
+    seconds = seconds.split("\x1f")
+    # A word with the separator in it splits in two; such lists are read row by row.
+    if len(firsts) != count or len(seconds) != count or numpy.any(ids[1:] <= ids[:-1]):
+      return self.load_rows()
+    intern = collection.strings.intern
+    self.ids = array("q", ids.tobytes())
+    collection.first = array("i", map(intern, firsts))
+    collection.second = array("i", map(intern, seconds))
+    collection.score = array("i", scores.astype(numpy.int32).tobytes())
+    collection.spelling_score = array("i", spelling_scores.astype(numpy.int32).tobytes())
+    collection.tags = bytearray(tags.astype(numpy.uint8).tobytes())
+    return collection
+
+  def load_rows(self):
+    collection = WordCollection()
+    self.ids = array("q")
+    intern = collection.strings.intern
+    rows = self.connect().execute(
+      "SELECT id, first, second, score, spelling_score, tag FROM words ORDER BY id"
+    )
+    for row_id, first, second, score, spelling_score, tag in rows:
+      self.ids.append(row_id)
+      collection.first.append(intern(first))
+      collection.second.append(intern(second))
+      collection.score.append(score)
+      collection.spelling_score.append(spelling_score)
+      collection.tags.append(tag)
+    return collection
+
+  def has_journal(self):
+    return False
+
+  def stream(self, batch_size):
+    rows = self.connect().execute(
+      "SELECT id, first, second, score, spelling_score, tag FROM words ORDER BY id"
+    )
+    self.ids = array("q")
+    while batch := rows.fetchmany(batch_size):
+      self.ids.extend(row[0] for row in batch)
+      yield [
+        {"words": [first, second], "score": score, "spelling_score": spelling_score, "tag": tag}
+        for _, first, second, score, spelling_score, tag in batch
+      ]
+
+  def append(self, operations, collection):
+    connection = self.connect()
+    with connection:
+      for operation in operations:
+        self.apply_operation(connection, operation)
+
+  def apply_operation(self, connection, operation):
+    op = operation["op"]
+    if op == "add":
+      cursor = connection.execute(
+        "INSERT INTO words (first, second) VALUES (?, ?)", list(operation["words"])
+      )
+      self.ids.append(cursor.lastrowid)
+    elif op == "edit":
+      connection.execute(
+        f"UPDATE words SET first = ?, second = ?, tag = {UNTAGGED} WHERE id = ?",
+        [*operation["words"], self.ids[operation["index"]]],
+      )
+    elif op == "delete":
+      connection.execute("DELETE FROM words WHERE id = ?", [self.ids[operation["index"]]])
+      del self.ids[operation["index"]]
+    elif op == "score":
+      field = score_column(operation["field"])
+      connection.execute(
+        f"UPDATE words SET {field} = {field} + ? WHERE id = ?",
+        [operation["delta"], self.ids[operation["index"]]],
+      )
+
+  def save(self, collection):
+    connection = self.connect()
+    records = zip(
+      (collection.strings[x] for x in collection.first),
+      (collection.strings[x] for x in collection.second),
+      collection.score,
+      collection.spelling_score,
+      collection.tags,
+    )
+    with connection:
+      connection.execute("DELETE FROM words")
+      connection.executemany(
+        "INSERT INTO words (first, second, score, spelling_score, tag) VALUES (?, ?, ?, ?, ?)", records
+      )
+    self.ids = array("q", (row[0] for row in connection.execute("SELECT id FROM words ORDER BY id")))
+
+  def position(self, row_id):
+    return bisect.bisect_left(self.ids, row_id)
+
+  # The queries below see the database, so callers write pending changes first.
+  def trained_count(self, repetitions_to_train, field="score"):
+    field = score_column(field)
+    return self.connect().execute(
+      f"SELECT COUNT(*) FROM words WHERE {field} >= ?", [repetitions_to_train]
+    ).fetchone()[0]
+
+  def untrained_words(self, repetitions_to_train, limit, field="score"):
+    field = score_column(field)
+    rows = self.connect().execute(
+      f"SELECT id FROM words WHERE {field} < ? ORDER BY id LIMIT ?",
+      [repetitions_to_train, limit],
+    )
+    return [self.position(row_id) for row_id, in rows]
+
+  def find_word(self, word):
+    rows = self.connect().execute(
+      "SELECT id FROM words WHERE first = ? UNION SELECT id FROM words WHERE second = ?",
+      [word, word],
+    )
+    return sorted(self.position(row_id) for row_id, in rows)
+
+
+def open_storage(path):
+  if pathlib.Path(path).suffix.lower() in SQLITE_SUFFIXES:
+    return SqliteStorage(path)
+  return JsonStorage(path)
+
+
+def read_words(path):
+  # Word pairs of any list. Nothing is written: no journal is moved and no tables are
+  # created in foreign SQLite files.
+  path = pathlib.Path(path)
+  if path.suffix.lower() not in SQLITE_SUFFIXES:
+    # Unlike JsonStorage.load, a journal of another snapshot is skipped, not set aside.
+    data = path.read_bytes()
+    collection = WordCollection.from_records(json.loads(data.decode("utf-8")))
+    operations = journal.read_journal(journal.journal_path(path), journal.snapshot_hash(data))
+    if operations and journal.fits(len(collection), operations):
+      journal.replay(collection, operations)
+    return [collection.words(idx) for idx in range(len(collection))]
+  connection = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+  try:
+    return connection.execute("SELECT first, second FROM words ORDER BY id").fetchall()
+  finally:
+    connection.close()
+
+
+def convert(source_path, destination_path):
+  source = open_storage(source_path)
+  destination = open_storage(destination_path)
+  destination.save(source.load())
+
+
+if __name__ == "__main__":
+  if len(sys.argv) != 3:
+    print(f"Usage: {sys.argv[0]} SOURCE DESTINATION", file=sys.stderr)
+    sys.exit(1)
+  convert(sys.argv[1], sys.argv[2])
@@ -0,0 +1,458 @@
+import collections
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import pathlib
+import posixpath
+import shlex
+import shutil
+import threading
+import time
+
+try:
+  import zstandard
+except ImportError:
+  zstandard = None
+
+
+SYNC_MANIFEST_FILENAME = ".sync_manifest.json"
+MANIFEST_TTL = 60
+DELTA_MIN_SIZE = 64 * 1024
+
+MANIFEST_COMMAND = (
+  "cd {root} 2>/dev/null || exit 0; "
+  "find . -type f -printf '%T@ %s %P\\n'; "
+  "echo --; "
+  "find . -type f -exec md5sum {{}} +"
+)
+
+
+Codec = collections.namedtuple(
+  "Codec", ["compress_command", "decompress_command", "compress", "decompress"]
+)
+
+GZIP_CODEC = Codec("gzip -c", "gzip -dc", gzip.compress, gzip.decompress)
+
+
+def get_codec(name):
+  if name == "zstd" and zstandard is not None:
+    return Codec(
+      "zstd -c -q",
+      "zstd -dc -q",
+      lambda data: zstandard.ZstdCompressor().compress(data),
+      lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+    )
+  if name in ("gzip", "zstd"):
+    return GZIP_CODEC
+  return None
+
+
+def file_hash(path):
+  digest = hashlib.md5()
+  with open(path, "rb") as fin:
+    for chunk in iter(lambda: fin.read(1 << 20), b""):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+
+def file_entry(path):
+  stat = os.stat(path)
+  return {"mtime": int(stat.st_mtime), "size": stat.st_size, "hash": file_hash(path)}
+
+
+def parse_manifest(output):
+  manifest = {}
+  stats, _, hashes = output.partition("--\n")
+  for line in stats.splitlines():
+    if line:
+      mtime, size, path = line.split(" ", 2)
+      manifest[path] = {"mtime": int(float(mtime)), "size": int(size), "hash": None}
+  for line in hashes.splitlines():
+    if line:
+      digest, path = line.split(" ", 1)
+      path = path.lstrip(" *")
+      if path.startswith("./"):
+        path = path[2:]
+      if path in manifest:
+        manifest[path]["hash"] = digest
+  return manifest
+
+
+class SftpSession:
+  def __init__(self, sftp, root, ssh, codec=None):
+    self.sftp = sftp
+    self.root = root
+    self.ssh = ssh
+    self.codec = codec
+    self.known_dirs = set()
+
+  def remote_path(self, path):
+    return posixpath.join(self.root, path)
+
+  def makedirs(self, directory):
+    if directory in self.known_dirs or directory in ("", "."):
+      return
+    try:
+      self.sftp.stat(directory)
+    except IOError:
+      self.makedirs(posixpath.dirname(directory))
+      self.sftp.mkdir(directory)
+    self.known_dirs.add(directory)
+
+  def get(self, path, local_path, mtime):
+    pathlib.Path(local_path).parent.mkdir(parents=True, exist_ok=True)
+    if not (self.codec and self.get_compressed(self.remote_path(path), local_path)):
+      self.sftp.get(self.remote_path(path), str(local_path))
+    os.utime(local_path, (mtime, mtime))
+
+  def get_compressed(self, remote_path, local_path):
+    status, output = self.run(f"{self.codec.compress_command} -- {shlex.quote(remote_path)}")
+    if status != 0:
+      return False
+    with open(local_path, "wb") as fout:
+      fout.write(self.codec.decompress(output))
+    return True
+
+  def put(self, local_path, path, mtime, remote_entry=None):
+    remote_path = self.remote_path(path)
+    if remote_entry is not None and os.path.getsize(local_path) >= DELTA_MIN_SIZE:
+      if self.put_delta(local_path, remote_path, mtime):
+        return
+    if self.codec and self.put_compressed(local_path, remote_path, mtime):
+      return
+    self.makedirs(posixpath.dirname(remote_path))
+    self.sftp.put(str(local_path), remote_path)
+    self.sftp.utime(remote_path, (mtime, mtime))
+
+  def delete(self, path):
+    try:
+      self.sftp.remove(self.remote_path(path))
+    except IOError:
+      pass
+
+  def put_compressed(self, local_path, remote_path, mtime):
+    with open(local_path, "rb") as fin:
+      data = self.codec.compress(fin.read())
+    quoted_path = shlex.quote(remote_path)
+    quoted_part = shlex.quote(remote_path + ".part")
+    # Keep the local mtime so the manifest freshness check still holds.
+    status, _ = self.run(
+      f"mkdir -p {shlex.quote(posixpath.dirname(remote_path) or '.')}"
+      f" && {self.codec.decompress_command} > {quoted_part}"
+      f" && mv -f {quoted_part} {quoted_path}"
+      f" && touch -m -d @{int(mtime)} {quoted_path}",
+      data,
+    )
+    return status == 0
+
+  def run(self, command, data=None):
+    stdin, stdout, _ = self.ssh.exec_command(command)
+    if data is not None:
+      stdin.write(data)
+    stdin.channel.shutdown_write()
+    output = stdout.read()
+    return stdout.channel.recv_exit_status(), output
+
+  def run_agent(self, args, data=None):
+    import delta
+    return self.run(" ".join(shlex.quote(x) for x in ["python3", "-c", delta.AGENT_SOURCE, *args]), data)
+
+  def put_delta(self, local_path, remote_path, mtime):
+    # rsync-style: fetch block signatures of the remote copy, send only changed blocks.
+    import delta
+    with open(local_path, "rb") as fin:
+      data = fin.read()
+    block_size = delta.block_size_for(len(data))
+    status, signature = self.run_agent(["signature", remote_path, str(block_size)])
+    if status != 0:
+      return False
+    patch = delta.compute_delta(signature, data, block_size)
+    patch_args = ["patch", remote_path, str(mtime)]
+    if self.codec:
+      patch = gzip.compress(patch)
+      patch_args.append("gzip")
+    if len(signature) + len(patch) >= len(data):
+      return False
+    status, _ = self.run_agent(patch_args, patch)
+    return status == 0
+
+
+class SshRemote:
+  def __init__(self, ssh, root, compression=""):
+    self.ssh = ssh
+    self.root = root
+    self.codec = get_codec(compression)
+
+  def manifest(self):
+    with self.ssh.guard():
+      _, stdout, _ = self.ssh.exec_command(MANIFEST_COMMAND.format(root=shlex.quote(self.root)))
+      return parse_manifest(stdout.read().decode())
+
+  @contextlib.contextmanager
+  def session(self):
+    with self.ssh.guard():
+      sftp = self.ssh.open_sftp()
+      try:
+        yield SftpSession(sftp, self.root, self.ssh, self.codec)
+      finally:
+        sftp.close()
+
+
+class LocalDirectoryRemote:
+  # Stand-in for the SSH remote backed by a local folder, for tests and offline use.
+  def __init__(self, root):
+    self.root = pathlib.Path(root)
+
+  def manifest(self):
+    if not self.root.exists():
+      return {}
+    return {
+      path.relative_to(self.root).as_posix(): file_entry(path)
+      for path in self.root.rglob("*")
+      if path.is_file()
+    }
+
+  @contextlib.contextmanager
+  def session(self):
+    yield self
+
+  def get(self, path, local_path, mtime):
+    pathlib.Path(local_path).parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(self.root / path, local_path)
+    os.utime(local_path, (mtime, mtime))
+
+  def put(self, local_path, path, mtime, remote_entry=None):
+    remote_path = self.root / path
+    remote_path.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(local_path, remote_path)
+    os.utime(remote_path, (mtime, mtime))
+
+  def delete(self, path):
+    (self.root / path).unlink(missing_ok=True)
+
+
+class SyncEngine:
+  def __init__(self, remote, local_root=".", manifest_path=SYNC_MANIFEST_FILENAME, ttl=MANIFEST_TTL):
+    self.remote = remote
+    self.local_root = pathlib.Path(local_root)
+    self.manifest_path = self.local_root / manifest_path
+    self.ttl = ttl
+    self.remote_manifest = None
+    self.fetched_at = 0
+    self.lock = threading.RLock()
+    self.local_manifest = {}
+    if self.manifest_path.exists():
+      with self.manifest_path.open("r", encoding="utf-8") as fin:
+        self.local_manifest = json.loads(fin.read())
+
+  def save_manifest(self):
+    with self.manifest_path.open("w", encoding="utf-8") as fout:
+      fout.write(json.dumps(self.local_manifest))
+
+  def local_path(self, path):
+    return self.local_root / path
+
+  def local_entry(self, path):
+    local_path = self.local_path(path)
+    cached = self.local_manifest.get(path)
+    if not local_path.exists():
+      # A file removed after it was synced keeps a tombstone until the server copy is removed too.
+      if cached is not None and cached.get("synced") is not None:
+        self.local_manifest[path] = {"synced": cached["synced"]}
+      else:
+        self.local_manifest.pop(path, None)
+      return None
+    stat = local_path.stat()
+    # Only rehash files whose mtime or size changed since the last sync.
+    if cached and cached.get("mtime") == int(stat.st_mtime) and cached.get("size") == stat.st_size:
+      return cached
+    self.local_manifest[path] = file_entry(local_path)
+    if cached is not None:
+      self.local_manifest[path]["synced"] = cached.get("synced")
+    return self.local_manifest[path]
+
+  def synced_hash(self, path):
+    # Hash of the copy both sides had after the last transfer of path.
+    return self.local_manifest.get(path, {}).get("synced")
+
+  def refresh(self, force=False):
+    if force or self.remote_manifest is None or time.monotonic() - self.fetched_at > self.ttl:
+      self.remote_manifest = self.remote.manifest()
+      self.fetched_at = time.monotonic()
+    return self.remote_manifest
+
+  def should_download(self, path):
+    remote = self.remote_manifest.get(path)
+    local = self.local_entry(path)
+    if remote is None:
+      return False
+    if local is None:
+      # Unless it was removed here and the server copy is still the one synced before.
+      return remote["hash"] != self.synced_hash(path)
+    return remote["hash"] != local["hash"] and remote["mtime"] >= local["mtime"]
+
+  def should_upload(self, path):
+    local = self.local_entry(path)
+    if local is None:
+      return False
+    remote = (self.remote_manifest or {}).get(path)
+    return remote is None or remote["hash"] != local["hash"]
+
+  def should_delete(self, path):
+    if self.local_entry(path) is not None:
+      return False
+    remote = (self.remote_manifest or {}).get(path)
+    return remote is not None and remote["hash"] == self.synced_hash(path)
+
+  def transfer(self, downloads=(), uploads=(), deletions=()):
+    if not downloads and not uploads and not deletions:
+      return
+    with self.remote.session() as session:
+      for path in downloads:
+        entry = self.remote_manifest[path]
+        session.get(path, self.local_path(path), entry["mtime"])
+        self.local_manifest[path] = dict(entry, synced=entry["hash"])
+      for path in uploads:
+        entry = self.local_entry(path)
+        remote_entry = (self.remote_manifest or {}).get(path)
+        session.put(self.local_path(path), path, entry["mtime"], remote_entry)
+        if self.remote_manifest is not None:
+          self.remote_manifest[path] = {key: entry[key] for key in ("mtime", "size", "hash")}
+        entry["synced"] = entry["hash"]
+      for path in deletions:
+        session.delete(path)
+        self.local_manifest.pop(path, None)
+        if self.remote_manifest is not None:
+          self.remote_manifest.pop(path, None)
+    self.save_manifest()
+
+  def pull(self, paths=None):
+    with self.lock:
+      remote_manifest = self.refresh()
+      paths = remote_manifest.keys() if paths is None else [pathlib.Path(x).as_posix() for x in paths]
+      downloads = [path for path in paths if self.should_download(path)]
+      self.transfer(downloads=downloads)
+      return downloads
+
+  def push(self, paths):
+    with self.lock:
+      paths = [pathlib.Path(x).as_posix() for x in paths]
+      uploads = [path for path in paths if self.should_upload(path)]
+      if any(self.local_entry(path) is None and self.synced_hash(path) for path in paths):
+        # Removing a file needs to know the server copy was not changed since the last sync.
+        self.refresh()
+      deletions = [path for path in paths if self.should_delete(path)]
+      self.transfer(uploads=uploads, deletions=deletions)
+      return uploads
+
+  def sync(self, paths=()):
+    with self.lock:
+      remote_manifest = self.refresh(force=True)
+      candidates = set(remote_manifest) | set(self.local_manifest)
+      candidates |= {pathlib.Path(x).as_posix() for x in paths}
+      downloads = sorted(path for path in candidates if self.should_download(path))
+      uploads = sorted(
+        path for path in candidates
+        if path not in downloads and path in self.local_manifest and self.should_upload(path)
+      )
+      deletions = sorted(path for path in candidates if self.should_delete(path))
+      self.transfer(downloads=downloads, uploads=uploads, deletions=deletions)
+      return downloads
+
+
+class UploadQueue:
+  PENDING = "pending"
+  UPLOADING = "uploading"
+  DONE = "done"
+  FAILED = "failed"
+
+  def __init__(self, upload, debounce=2.0, max_workers=1, on_status=None):
+    self.upload = upload
+    self.debounce = debounce
+    self.on_status = on_status
+    self.condition = threading.Condition()
+    # path -> monotonic time after which it may be uploaded
+    self.pending = {}
+    self.in_flight = set()
+    self.statuses = {}
+    self.closed = False
+    self.workers = [
+      threading.Thread(target=self.work, name=f"upload-{idx}", daemon=True)
+      for idx in range(max_workers)
+    ]
+    for worker in self.workers:
+      worker.start()
+
+  def set_status(self, path, status):
+    self.statuses[path] = status
+    if self.on_status is not None:
+      self.on_status(path, status)
+
+  def submit(self, path):
+    path = pathlib.Path(path).as_posix()
+    with self.condition:
+      # Later submissions of the same path replace the pending one and restart the delay.
+      self.pending[path] = time.monotonic() + self.debounce
+      self.set_status(path, self.PENDING)
+      self.condition.notify_all()
+
+  def next_path(self):
+    now = time.monotonic()
+    ready = [
+      (due, path) for path, due in self.pending.items()
+      if path not in self.in_flight and due <= now
+    ]
+    if ready:
+      return min(ready)[1], None
+    waiting = [due for path, due in self.pending.items() if path not in self.in_flight]
+    return None, (min(waiting) - now if waiting else None)
+
+  def work(self):
+    while True:
+      with self.condition:
+        while True:
+          path, timeout = self.next_path()
+          if path is not None or (self.closed and not self.pending):
+            break
+          self.condition.wait(timeout)
+        if path is None:
+          return
+        del self.pending[path]
+        self.in_flight.add(path)
+        self.set_status(path, self.UPLOADING)
+      try:
+        self.upload(path)
+        status = self.DONE
+      except Exception:
+        status = self.FAILED
+      with self.condition:
+        self.in_flight.discard(path)
+        if path not in self.pending:
+          self.set_status(path, status)
+        self.condition.notify_all()
+
+  def snapshot(self):
+    with self.condition:
+      return dict(self.statuses)
+
+  def flush(self, timeout=None):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with self.condition:
+      for path in self.pending:
+        self.pending[path] = 0
+      self.condition.notify_all()
+      while self.pending or self.in_flight:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+          return False
+        self.condition.wait(remaining)
+    return True
+
+  def close(self, timeout=None):
+    flushed = self.flush(timeout)
+    with self.condition:
+      self.closed = True
+      self.condition.notify_all()
+    return flushed
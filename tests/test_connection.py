@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+import connection
+
+
+class FakeTransport:
+  def __init__(self):
+    self.active = True
+
+  def is_active(self):
+    return self.active
+
+  def set_keepalive(self, interval):
+    self.keepalive = interval
+
+
+class FakeClient:
+  # Stands in for paramiko.SSHClient; `gate` holds connect() like an unreachable host.
+  gate = None
+  failures = 0
+  created = []
+
+  def __init__(self):
+    self.transport = FakeTransport()
+    self.created.append(self)
+
+  def load_system_host_keys(self):
+    pass
+
+  def connect(self, host, **kwargs):
+    if FakeClient.gate is not None:
+      FakeClient.gate.wait()
+    if FakeClient.failures:
+      FakeClient.failures -= 1
+      raise OSError("unreachable")
+
+  def get_transport(self):
+    return self.transport
+
+  def close(self):
+    self.transport.active = False
+
+
+@pytest.fixture(autouse=True)
+def fake_client(monkeypatch):
+  FakeClient.gate = None
+  FakeClient.failures = 0
+  FakeClient.created = []
+  monkeypatch.setattr(connection, "SSHClient", FakeClient)
+
+
+def test_reconnects_after_the_transport_dies():
+  ssh = connection.SshConnection("host", "user")
+  first = ssh.client()
+  assert ssh.client() is first
+  first.transport.active = False
+  assert ssh.client() is not first
+  assert len(FakeClient.created) == 2
+
+
+def test_failed_connects_back_off():
+  ssh = connection.SshConnection("host", "user")
+  FakeClient.failures = 1
+  with pytest.raises(connection.ConnectionUnavailable):
+    ssh.client()
+  with pytest.raises(connection.ConnectionUnavailable, match="postponed"):
+    ssh.client()
+  assert len(FakeClient.created) == 1
+  ssh.retry_at = 0
+  ssh.client()
+  assert ssh.failures == 0
+
+
+def test_close_does_not_wait_for_a_pending_connect():
+  ssh = connection.SshConnection("host", "user")
+  FakeClient.gate = threading.Event()
+  errors = []
+  def connect():
+    try:
+      ssh.client()
+    except connection.ConnectionUnavailable as error:
+      errors.append(error)
+  worker = threading.Thread(target=connect)
+  worker.start()
+  time.sleep(0.05)
+  started = time.monotonic()
+  ssh.close()
+  assert time.monotonic() - started < 0.05
+  FakeClient.gate.set()
+  worker.join(1)
+  # The connection finished after close() is thrown away, not kept open.
+  assert errors and ssh.ssh is None
+  assert not FakeClient.created[0].transport.is_active()
+
+
+def test_guard_drops_a_broken_transport():
+  ssh = connection.SshConnection("host", "user")
+  client = ssh.client()
+  with pytest.raises(EOFError):
+    with ssh.guard():
+      raise EOFError()
+  assert ssh.ssh is None and not client.transport.is_active()
@@ -0,0 +1,117 @@
+import random
+import types
+
+import numpy
+import pytest
+
+import scheduler
+
+
+SETTINGS = types.SimpleNamespace(repetitions_to_train=25, active_pool_size=4)
+STEPS = 200000
+
+
+def baseline_probabilities(scores, settings, active=()):
+  # The list-comprehension formula select_word used before the scheduler module.
+  words = [
+    idx for idx in range(len(scores))
+    if scores[idx] < settings.repetitions_to_train and idx not in active
+  ][:settings.active_pool_size]
+  words += [
+    idx for idx in range(len(scores))
+    if scores[idx] >= settings.repetitions_to_train and idx not in active
+  ]
+  weights = [
+    1 if scores[idx] < settings.repetitions_to_train else
+      0.5 * (0.95 ** (scores[idx] / settings.repetitions_to_train))
+    for idx in words
+  ]
+  sum_of_trainded_weights = sum([0 if weight == 1 else weight for weight in weights]) / settings.active_pool_size
+  if sum_of_trainded_weights < 1:
+    sum_of_trainded_weights = 1
+  weights = [1 if weight == 1 else weight / sum_of_trainded_weights for weight in weights]
+  total = sum(weights)
+  return {word: weight / total for word, weight in zip(words, weights)}
+
+
+class GridRandom:
+  # Walks [0, 1) in even steps, so select() frequencies approach the exact distribution.
+  def __init__(self, steps):
+    self.points = ((idx + 0.5) / steps for idx in range(steps))
+
+  def random(self):
+    return next(self.points)
+
+
+def random_scores(seed, size=60):
+  generator = random.Random(seed)
+  return [generator.choice([0, 0, 3, 10, 25, 26, 40, 100, 300]) for _ in range(size)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_selection_probabilities_match_baseline(seed):
+  scores = random_scores(seed)
+  words, probabilities = scheduler.selection_probabilities(scores, SETTINGS)
+  expected = baseline_probabilities(scores, SETTINGS)
+  assert sorted(words.tolist()) == sorted(expected)
+  for word, probability in zip(words.tolist(), probabilities.tolist()):
+    assert probability == pytest.approx(expected[word])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_select_matches_baseline_with_active_words(seed):
+  scores = random_scores(seed)
+  word_scheduler = scheduler.WordScheduler(scores, SETTINGS)
+  active = set(random.Random(seed).sample(range(len(scores)), 5))
+  for idx in active:
+    word_scheduler.activate(idx)
+  grid = GridRandom(STEPS)
+  counts = {}
+  for _ in range(STEPS):
+    word = word_scheduler.select(grid)
+    counts[word] = counts.get(word, 0) + 1
+  expected = baseline_probabilities(scores, SETTINGS, active)
+  assert set(counts) == set(expected)
+  for word, probability in expected.items():
+    assert counts[word] / STEPS == pytest.approx(probability, abs=2 / STEPS)
+
+
+def test_select_follows_score_updates():
+  scores = random_scores(7)
+  word_scheduler = scheduler.WordScheduler(scores, SETTINGS)
+  for idx in (0, 5, 17):
+    scores[idx] += 30
+    word_scheduler.update_score(idx, scores[idx])
+  word_scheduler.extend([0, 50])
+  scores += [0, 50]
+  grid = GridRandom(STEPS)
+  counts = numpy.zeros(len(scores))
+  for _ in range(STEPS):
+    counts[word_scheduler.select(grid)] += 1
+  expected = baseline_probabilities(scores, SETTINGS)
+  for word in range(len(scores)):
+    assert counts[word] / STEPS == pytest.approx(expected.get(word, 0.0), abs=2 / STEPS)
+
+
+def drain(queue, missed):
+  asked = []
+  while queue:
+    word = queue.next()
+    asked.append(word)
+    queue.answer(not missed(word, asked.count(word)))
+  return asked
+
+
+def test_spelling_queue_retries_missed_words_after_retry_distance():
+  queue = scheduler.SpellingQueue(range(1, 9), retry_distance=3)
+  asked = drain(queue, lambda word, attempt: word in (1, 2) and attempt == 1)
+  # Each missed word comes back after three other words, in the order they were missed.
+  assert asked == [1, 2, 3, 4, 1, 2, 5, 6, 7, 8]
+
+
+def test_spelling_queue_asks_retries_when_words_run_out():
+  queue = scheduler.SpellingQueue([1, 2], retry_distance=5)
+  assert len(queue) == 2
+  asked = drain(queue, lambda word, attempt: attempt < 3 and word == 2)
+  assert asked == [1, 2, 2, 2]
+  assert len(queue) == 0
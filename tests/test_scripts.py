@@ -0,0 +1,40 @@
+import scripts
+
+
+PAIRS = [
+  ("кот", "cat"),
+  ("cat", "кот"),
+  ("сло́во", "λέξη"),
+  ("λέξη", "сло́во"),
+  ("«ёж»", "hedgehog"),
+  ("№ 5", "five"),
+  ("123", "кот"),
+  ("кот", "café"),
+  ("wоrd", "слово"),
+  ("кот", "кот"),
+  ("cat", "dog"),
+  ("", "cat"),
+  ("—", "…"),
+  ("½", "к"),
+  ("кот", "日本"),
+  ("кот\n", "cat"),
+]
+
+
+def per_character_script(word):
+  result, result_priority = "", -1
+  for char in word:
+    script = scripts.char_script(char)
+    priority = scripts.SCRIPT_PRIORITY.get(script, 2)
+    if priority > result_priority:
+      result, result_priority = script, priority
+  return result
+
+
+def expected(words):
+  return scripts.pair_class(per_character_script(words[0]), per_character_script(words[1]))
+
+
+def test_classify_matches_per_character_scripts():
+  for words in PAIRS:
+    assert scripts.classify(words) == expected(words), words
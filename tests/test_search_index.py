@@ -0,0 +1,78 @@
+import json
+import os
+
+import search_index
+
+
+def normalize(word):
+  return word.strip().lower()
+
+
+def write_list(path, pairs, mtime=None):
+  path.write_text(json.dumps([{"words": list(pair), "score": 0} for pair in pairs], ensure_ascii=False), encoding="utf-8")
+  if mtime is not None:
+    os.utime(path, (mtime, mtime))
+
+
+def found(index, word, **kwargs):
+  return [(result.list_name, result.words) for result in index.search(word, **kwargs)]
+
+
+def test_refresh_reads_only_changed_lists(tmp_path):
+  write_list(tmp_path / "animals.json", [("кот", "cat"), ("собака", "dog")], 1000)
+  write_list(tmp_path / "food.json", [("хлеб", "bread")], 1000)
+  (tmp_path / "settings.json").write_text("{}", encoding="utf-8")
+  index = search_index.SearchIndex(tmp_path, normalize)
+  assert index.refresh()
+  assert sorted(index.lists) == ["animals.json", "food.json"]
+  assert not index.refresh()
+
+  # A new index on the folder starts from the saved one and reads nothing.
+  reopened = search_index.SearchIndex(tmp_path, normalize)
+  read = []
+  reopened.read_list = lambda name: read.append(name) or []
+  assert not reopened.refresh()
+  assert read == []
+  assert found(reopened, "Cat", exact=True) == [("animals.json", ("кот", "cat"))]
+
+  write_list(tmp_path / "animals.json", [("кот", "cat"), ("мышь", "mouse")], 2000)
+  (tmp_path / "food.json").unlink()
+  assert index.refresh()
+  assert sorted(index.lists) == ["animals.json"]
+  assert found(index, "mouse", exact=True) == [("animals.json", ("мышь", "mouse"))]
+  assert found(index, "dog", exact=True) == []
+  assert found(index, "bread", exact=True) == []
+
+
+def test_compact_keeps_only_live_entries(tmp_path):
+  index = search_index.SearchIndex(tmp_path, normalize)
+  for name, pairs in [("a.json", [("кот", "cat")]), ("b.json", [("пёс", "dog"), ("лиса", "fox")])]:
+    start = index.add_entries(name, pairs)
+    index.lists[name] = {"fingerprint": [], "start": start, "count": len(pairs)}
+  index.drop_list("b.json")
+  assert index.dead == 2
+  assert found(index, "dog", exact=True) == []
+
+  index.compact()
+  assert index.dead == 0
+  assert index.entries == [("кот", "cat")]
+  assert index.lists["a.json"]["start"] == 0
+  assert found(index, "cat", exact=True) == [("a.json", ("кот", "cat"))]
+
+
+def test_lookup_exact_and_similar_words(tmp_path):
+  write_list(tmp_path / "one.json", [("кошка", "cat"), ("каталог", "catalogue"), ("машина", "car")])
+  write_list(tmp_path / "two.json", [("кот", "Cat ")])
+  index = search_index.SearchIndex(tmp_path, normalize)
+  index.refresh()
+
+  assert sorted(found(index, "cat", exact=True)) == [("one.json", ("кошка", "cat")), ("two.json", ("кот", "Cat "))]
+  assert found(index, "cat", exact=True, exclude="two.json") == [("one.json", ("кошка", "cat"))]
+
+  # Half the grams of the query are enough; shorter words rank first among equal matches.
+  similar = index.search("cats")
+  assert {result.words for result in similar[:2]} == {("кошка", "cat"), ("кот", "Cat ")}
+  assert [result.words for result in similar[2:]] == [("каталог", "catalogue")]
+  assert all(search_index.MIN_SIMILARITY <= result.similarity < 1 for result in similar)
+  assert len(index.search("cat", limit=1)) == 1
+  assert index.search("  ") == []
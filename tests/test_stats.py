@@ -0,0 +1,55 @@
+import stats
+
+
+def answers(store):
+  return sum(day[0] for day in store.summary["days"].values())
+
+
+def recorded_store(list_path, count):
+  store = stats.StatsStore(list_path)
+  store.start_session("cards")
+  for idx in range(count):
+    store.record_answer("cards", f"word{idx}", idx % 2 == 0)
+  store.finish_session("cards", learned=1)
+  return store
+
+
+def test_catch_up_folds_events_appended_after_the_summary(tmp_path):
+  list_path = tmp_path / "list.json"
+  recorded_store(list_path, 3)
+  # Answers of a session that ended without saving the summary are only in the log.
+  store = stats.StatsStore(list_path)
+  store.record_answer("cards", "word0", False)
+  reopened = stats.StatsStore(list_path)
+  assert answers(reopened) == 4
+  assert reopened.summary["words"][str(stats.word_key("word0"))] == [2, 1]
+  assert reopened.summary["offset"] == stats.log_path(list_path).stat().st_size
+
+
+def test_catch_up_drops_a_torn_record(tmp_path):
+  list_path = tmp_path / "list.json"
+  recorded_store(list_path, 3)
+  log = stats.log_path(list_path)
+  size = log.stat().st_size
+  with log.open("ab") as fout:
+    fout.write(stats.EVENT.pack(0, stats.ANSWER, 0, 1, 0)[:5])
+  store = stats.StatsStore(list_path)
+  assert log.stat().st_size == size
+  assert answers(store) == 3
+  store.record_answer("cards", "word1", True)
+  assert answers(stats.StatsStore(list_path)) == 4
+
+
+def test_catch_up_rebuilds_after_the_log_was_truncated(tmp_path):
+  list_path = tmp_path / "list.json"
+  recorded_store(list_path, 4)
+  log = stats.log_path(list_path)
+  # Keep the session start and the first two answers.
+  with log.open("r+b") as fout:
+    fout.truncate(3 * stats.EVENT.size)
+  store = stats.StatsStore(list_path)
+  assert answers(store) == 2
+  assert store.summary["offset"] == 3 * stats.EVENT.size
+  assert "cards" in store.summary["open_sessions"]
+  # Word names are not in the log, so they survive the rebuild.
+  assert store.summary["names"][str(stats.word_key("word3"))] == "word3"
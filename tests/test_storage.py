@@ -0,0 +1,254 @@
+import json
+import os
+import sqlite3
+import time
+
+import journal
+import storage
+import sync
+from word_collection import UNTAGGED, WordCollection
+
+
+def write_list(path, pairs, mtime):
+  path.write_text(json.dumps([{"words": list(pair), "score": 0} for pair in pairs], ensure_ascii=False), encoding="utf-8")
+  os.utime(path, (mtime, mtime))
+
+
+def words(collection):
+  return [collection.words(idx) for idx in range(len(collection))]
+
+
+def test_stale_journal_is_set_aside(tmp_path):
+  list_path = tmp_path / "list.json"
+  write_list(list_path, [("а", "a")], time.time())
+  list_storage = storage.JsonStorage(list_path)
+  collection = list_storage.load()
+  collection.append({"words": ["б", "b"], "score": 0})
+  list_storage.append([{"op": "add", "words": ["б", "b"]}], collection)
+  journal_text = list_storage.journal_path.read_text(encoding="utf-8")
+
+  write_list(list_path, [("в", "v")], time.time())
+  assert words(list_storage.load()) == [("в", "v")]
+  assert not list_storage.journal_path.exists()
+  assert list_storage.stale_journal_path.read_text(encoding="utf-8") == journal_text
+
+  write_list(list_path, [("г", "g")], time.time())
+  journal.append_journal(list_storage.journal_path, "other", [{"op": "add", "words": ["д", "d"]}])
+  list_storage.load()
+  assert list_storage.stale_journal_path.name == "list.json.journal.stale1"
+
+
+def test_journaled_edit_is_not_replaced_by_an_older_remote_snapshot(tmp_path):
+  local_root = tmp_path / "local"
+  remote_root = tmp_path / "remote"
+  local_root.mkdir()
+  remote_root.mkdir()
+  now = time.time()
+  write_list(local_root / "list.json", [("а", "a")], now - 100)
+  # Edited elsewhere after our snapshot was written, but before the local edit below.
+  write_list(remote_root / "list.json", [("а", "a"), ("я", "ya")], now - 50)
+
+  list_storage = storage.JsonStorage(local_root / "list.json")
+  collection = list_storage.load()
+  collection.append({"words": ["б", "b"], "score": 0})
+  list_storage.append([{"op": "add", "words": ["б", "b"]}], collection)
+
+  engine = sync.SyncEngine(sync.LocalDirectoryRemote(remote_root), local_root)
+  assert engine.pull(["list.json"]) == []
+  assert words(storage.JsonStorage(local_root / "list.json").load()) == [("а", "a"), ("б", "b")]
+  assert list_storage.journal_path.exists()
+
+
+def test_empty_append_keeps_snapshot_mtime(tmp_path):
+  list_path = tmp_path / "list.json"
+  write_list(list_path, [("а", "a")], 1000000)
+  list_storage = storage.JsonStorage(list_path)
+  list_storage.load()
+  list_storage.append([], WordCollection())
+  assert list_path.stat().st_mtime == 1000000
+
+
+def tagged_collection():
+  collection = WordCollection.from_records([{"words": ["а", "a"], "score": 1}, {"words": ["б", "b"], "score": 2}])
+  collection.tags[0] = 0x12
+  return collection
+
+
+def test_json_snapshot_keeps_tags(tmp_path):
+  list_storage = storage.JsonStorage(tmp_path / "list.json")
+  list_storage.save(tagged_collection())
+  assert list(list_storage.load().tags) == [0x12, UNTAGGED]
+  assert [record.get("tag") for record in next(list_storage.stream(10))] == [0x12, None]
+
+
+def test_sqlite_keeps_tags_and_untags_edits(tmp_path):
+  list_storage = storage.SqliteStorage(tmp_path / "list.sqlite")
+  collection = tagged_collection()
+  list_storage.save(collection)
+  assert list(storage.SqliteStorage(list_storage.path).load().tags) == [0x12, UNTAGGED]
+  list_storage.append([{"op": "edit", "index": 0, "words": ["в", "v"]}], collection)
+  assert list(storage.SqliteStorage(list_storage.path).load().tags) == [UNTAGGED, UNTAGGED]
+
+
+def test_sqlite_without_tag_column_is_migrated(tmp_path):
+  path = tmp_path / "old.sqlite"
+  connection = sqlite3.connect(path)
+  connection.execute(
+    "CREATE TABLE words (id INTEGER PRIMARY KEY, first TEXT NOT NULL, second TEXT NOT NULL,"
+    " score INTEGER NOT NULL DEFAULT 0, spelling_score INTEGER NOT NULL DEFAULT 0)"
+  )
+  connection.execute("INSERT INTO words (first, second, score) VALUES ('а', 'a', 3)")
+  connection.commit()
+  connection.close()
+  collection = storage.SqliteStorage(path).load()
+  assert words(collection) == [("а", "a")]
+  assert list(collection.tags) == [UNTAGGED]
+
+
+def test_read_words_leaves_journals_alone(tmp_path):
+  list_path = tmp_path / "list.json"
+  write_list(list_path, [("а", "a")], time.time())
+  list_storage = storage.JsonStorage(list_path)
+  collection = list_storage.load()
+  collection.append({"words": ["б", "b"], "score": 0})
+  list_storage.append([{"op": "add", "words": ["б", "b"]}], collection)
+  assert storage.read_words(list_path) == [("а", "a"), ("б", "b")]
+
+  write_list(list_path, [("в", "v")], time.time())
+  journal_text = list_storage.journal_path.read_text(encoding="utf-8")
+  assert storage.read_words(list_path) == [("в", "v")]
+  assert list_storage.journal_path.read_text(encoding="utf-8") == journal_text
+  assert sorted(path.name for path in tmp_path.iterdir()) == ["list.json", "list.json.journal"]
+
+
+def test_append_after_sync_replaced_the_snapshot(tmp_path):
+  list_path = tmp_path / "list.json"
+  write_list(list_path, [("а", "a"), ("б", "b")], time.time() - 100)
+  list_storage = storage.JsonStorage(list_path)
+  collection = list_storage.load()
+  collection.append({"words": ["в", "v"], "score": 0})
+  list_storage.append([{"op": "add", "words": ["в", "v"]}], collection)
+
+  # A pull brings a shorter list and the journal written against it elsewhere.
+  write_list(list_path, [("я", "ya")], time.time())
+  list_storage.journal_path.unlink()
+  journal.append_journal(list_storage.journal_path, journal.snapshot_hash(list_path.read_bytes()), [{"op": "edit", "index": 0, "words": ["ю", "yu"]}])
+  foreign_journal = list_storage.journal_path.read_text(encoding="utf-8")
+
+  del collection[1]
+  list_storage.append([{"op": "delete", "index": 1}], collection)
+  assert words(storage.JsonStorage(list_path).load()) == [("а", "a"), ("в", "v")]
+  assert list_storage.stale_journal_path.read_text(encoding="utf-8") == foreign_journal
+
+
+def test_journal_that_does_not_fit_is_set_aside(tmp_path):
+  list_path = tmp_path / "list.json"
+  write_list(list_path, [("а", "a")], time.time())
+  journal.append_journal(journal.journal_path(list_path), journal.snapshot_hash(list_path.read_bytes()), [{"op": "delete", "index": 3}])
+  list_storage = storage.JsonStorage(list_path)
+  assert words(list_storage.load()) == [("а", "a")]
+  assert list_storage.stale_journal_path is not None
+  assert storage.read_words(list_path) == [("а", "a")]
+
+
+def test_compacted_journal_is_removed_from_the_server(tmp_path):
+  local_root = tmp_path / "local"
+  remote_root = tmp_path / "remote"
+  local_root.mkdir()
+  write_list(local_root / "list.json", [("а", "a")], time.time() - 100)
+  engine = sync.SyncEngine(sync.LocalDirectoryRemote(remote_root), local_root)
+  list_storage = storage.JsonStorage(local_root / "list.json")
+  collection = list_storage.load()
+  collection.append({"words": ["б", "b"], "score": 0})
+  list_storage.append([{"op": "add", "words": ["б", "b"]}], collection)
+  assert engine.push(["list.json", "list.json.journal"]) == ["list.json", "list.json.journal"]
+
+  list_storage.save(collection)
+  engine.push(["list.json", "list.json.journal"])
+  assert not (remote_root / "list.json.journal").exists()
+  assert engine.sync() == []
+  assert not list_storage.journal_path.exists()
+  assert words(storage.JsonStorage(local_root / "list.json").load()) == [("а", "a"), ("б", "b")]
+
+
+def test_journal_removed_here_stays_removed_on_pull(tmp_path):
+  local_root = tmp_path / "local"
+  remote_root = tmp_path / "remote"
+  local_root.mkdir()
+  write_list(local_root / "list.json", [("а", "a")], time.time() - 100)
+  engine = sync.SyncEngine(sync.LocalDirectoryRemote(remote_root), local_root)
+  list_storage = storage.JsonStorage(local_root / "list.json")
+  collection = list_storage.load()
+  collection.append({"words": ["б", "b"], "score": 0})
+  list_storage.append([{"op": "add", "words": ["б", "b"]}], collection)
+  engine.push(["list.json", "list.json.journal"])
+
+  # Compacted later while offline; the next pull must not bring the journal back.
+  list_storage.save(collection)
+  os.utime(local_root / "list.json", (time.time() + 10, time.time() + 10))
+  engine = sync.SyncEngine(sync.LocalDirectoryRemote(remote_root), local_root)
+  assert engine.pull() == []
+  assert not list_storage.journal_path.exists()
+  reloaded = storage.JsonStorage(local_root / "list.json")
+  assert words(reloaded.load()) == [("а", "a"), ("б", "b")]
+  assert reloaded.stale_journal_path is None
+
+
+def test_stream_reads_the_journal_after_the_last_batch(tmp_path):
+  list_path = tmp_path / "list.json"
+  write_list(list_path, [("а", "a"), ("б", "b"), ("в", "v")], time.time())
+  list_storage = storage.JsonStorage(list_path)
+  collection = list_storage.load()
+  operations = [{"op": "delete", "index": 0}, {"op": "add", "words": ["г", "g"]}]
+  journal.replay(collection, operations)
+  list_storage.append(operations, collection)
+
+  streamed = WordCollection()
+  for batch in list_storage.stream(2):
+    assert list_storage.stream_operations == []
+    streamed.extend(batch)
+  journal.replay(streamed, list_storage.stream_operations)
+  assert words(streamed) == [("б", "b"), ("в", "v"), ("г", "g")]
+
+
+def test_sqlite_queries_use_collection_positions(tmp_path):
+  list_storage = storage.SqliteStorage(tmp_path / "list.sqlite")
+  collection = WordCollection.from_records([
+    {"words": ["а", "a"], "score": 5},
+    {"words": ["б", "b"], "score": 0},
+    {"words": ["в", "v"], "score": 0},
+    {"words": ["г", "a"], "score": 1, "spelling_score": 7},
+  ])
+  list_storage.save(collection)
+  del collection[0]
+  list_storage.append([{"op": "delete", "index": 0}, {"op": "add", "words": ["д", "d"]}], collection)
+  indexes = {row[0] for row in list_storage.connect().execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+  assert {"words_first", "words_second", "words_score", "words_spelling_score"} <= indexes
+  assert list_storage.find_word("a") == [2]
+  assert list_storage.find_word("д") == [3]
+  assert list_storage.untrained_words(2, 2) == [0, 1]
+  assert list_storage.untrained_words(5, 10, "spelling_score") == [0, 1, 3]
+  assert list_storage.trained_count(1) == 1
+  assert list_storage.trained_count(1, "spelling_score") == 1
+
+
+def test_sqlite_load_matches_row_by_row_load(tmp_path):
+  list_storage = storage.SqliteStorage(tmp_path / "list.sqlite")
+  collection = WordCollection.from_records([
+    {"words": ["а", "a"], "score": 5, "spelling_score": 2},
+    {"words": ["", "b,c"], "score": -1},
+    {"words": ["в", "a"], "score": 0},
+  ])
+  collection.tags[2] = 0x12
+  list_storage.save(collection)
+  list_storage.append([{"op": "delete", "index": 0}], collection)
+  loaded = list_storage.load()
+  ids = list(list_storage.ids)
+  by_rows = list_storage.load_rows()
+  assert [dict(record) for record in loaded] == [dict(record) for record in by_rows]
+  assert loaded.tags == by_rows.tags and ids == list(list_storage.ids)
+
+  # The column separator inside a word falls back to reading row by row.
+  list_storage.append([{"op": "add", "words": ["г\x1fд", "g"]}], loaded)
+  assert words(storage.SqliteStorage(list_storage.path).load())[-1] == ("г\x1fд", "g")
+  assert len(storage.SqliteStorage(list_storage.path).load()) == 3
@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+
+import pytest
+
+import sync
+
+
+class CountingRemote(sync.LocalDirectoryRemote):
+  def __init__(self, root):
+    super().__init__(root)
+    self.manifest_calls = 0
+    self.sessions = 0
+
+  def manifest(self):
+    self.manifest_calls += 1
+    return super().manifest()
+
+  def session(self):
+    self.sessions += 1
+    return super().session()
+
+
+@pytest.fixture
+def folders(tmp_path):
+  local_root = tmp_path / "local"
+  remote_root = tmp_path / "remote"
+  local_root.mkdir()
+  remote_root.mkdir()
+  return local_root, remote_root
+
+
+def write(path, text, mtime):
+  path.parent.mkdir(parents=True, exist_ok=True)
+  path.write_text(text, encoding="utf-8")
+  os.utime(path, (mtime, mtime))
+
+
+def test_pull_downloads_new_and_newer_files_with_their_mtime(folders):
+  local_root, remote_root = folders
+  write(remote_root / "lists" / "new.json", "new", 1000)
+  write(remote_root / "newer.json", "remote", 3000)
+  write(local_root / "newer.json", "local", 2000)
+  write(remote_root / "older.json", "remote", 1000)
+  write(local_root / "older.json", "local", 2000)
+  write(remote_root / "same.json", "same", 1000)
+  write(local_root / "same.json", "same", 2000)
+  engine = sync.SyncEngine(CountingRemote(remote_root), local_root)
+
+  assert sorted(engine.pull()) == ["lists/new.json", "newer.json"]
+  assert (local_root / "lists" / "new.json").read_text(encoding="utf-8") == "new"
+  assert (local_root / "newer.json").read_text(encoding="utf-8") == "remote"
+  assert (local_root / "older.json").read_text(encoding="utf-8") == "local"
+  assert int((local_root / "newer.json").stat().st_mtime) == 3000
+  assert int((local_root / "lists" / "new.json").stat().st_mtime) == 1000
+  assert engine.pull() == []
+
+
+def test_pull_of_missing_remote_file_does_nothing(folders):
+  local_root, remote_root = folders
+  write(local_root / "list.json", "local", 1000)
+  engine = sync.SyncEngine(CountingRemote(remote_root), local_root)
+  assert engine.pull(["list.json", "absent.json"]) == []
+  assert not engine.should_download("absent.json")
+  assert engine.remote.sessions == 0
+
+
+def test_push_uploads_only_changed_files_and_keeps_mtime(folders):
+  local_root, remote_root = folders
+  write(local_root / "list.json", "v1", 1000)
+  write(local_root / "same.json", "same", 1000)
+  write(remote_root / "same.json", "same", 500)
+  engine = sync.SyncEngine(CountingRemote(remote_root), local_root)
+  engine.refresh()
+
+  assert engine.should_upload("list.json")
+  assert not engine.should_upload("same.json")
+  assert not engine.should_upload("absent.json")
+  assert engine.push(["list.json", "same.json", "absent.json"]) == ["list.json"]
+  assert (remote_root / "list.json").read_text(encoding="utf-8") == "v1"
+  assert int((remote_root / "list.json").stat().st_mtime) == 1000
+  # The cached remote manifest knows about the upload, so nothing is sent twice.
+  assert engine.push(["list.json"]) == []
+
+  write(local_root / "list.json", "v2", 2000)
+  assert engine.push(["list.json"]) == ["list.json"]
+  assert (remote_root / "list.json").read_text(encoding="utf-8") == "v2"
+
+
+def test_sync_downloads_and_uploads_in_one_session(folders):
+  local_root, remote_root = folders
+  write(remote_root / "settings.json", "remote settings", 3000)
+  write(local_root / "settings.json", "local settings", 2000)
+  write(remote_root / "stale.json", "old", 1000)
+  engine = sync.SyncEngine(CountingRemote(remote_root), local_root)
+  write(local_root / "stale.json", "edited", 2000)
+  write(local_root / "list.json", "mine", 2000)
+
+  assert engine.sync(["list.json"]) == ["settings.json"]
+  assert engine.remote.sessions == 1
+  assert (local_root / "settings.json").read_text(encoding="utf-8") == "remote settings"
+  assert (remote_root / "stale.json").read_text(encoding="utf-8") == "edited"
+  assert (remote_root / "list.json").read_text(encoding="utf-8") == "mine"
+  assert engine.sync() == []
+  assert engine.remote.sessions == 1
+
+
+def test_remote_manifest_is_reused_within_ttl(folders):
+  local_root, remote_root = folders
+  write(remote_root / "list.json", "v1", 1000)
+  engine = sync.SyncEngine(CountingRemote(remote_root), local_root, ttl=60)
+  engine.pull(["list.json"])
+  engine.pull(["list.json"])
+  assert engine.remote.manifest_calls == 1
+
+  # sync always asks the server, and a zero ttl refetches on every pull.
+  engine.sync()
+  assert engine.remote.manifest_calls == 2
+  engine.ttl = 0
+  write(remote_root / "list.json", "v2", 2000)
+  assert engine.pull(["list.json"]) == ["list.json"]
+  assert engine.remote.manifest_calls == 3
+
+
+def test_local_manifest_skips_rehashing_unchanged_files(folders, monkeypatch):
+  local_root, remote_root = folders
+  write(local_root / "list.json", "v1", 1000)
+  engine = sync.SyncEngine(CountingRemote(remote_root), local_root)
+  engine.push(["list.json"])
+  saved = json.loads((local_root / sync.SYNC_MANIFEST_FILENAME).read_text(encoding="utf-8"))
+  assert saved["list.json"]["mtime"] == 1000
+
+  hashed = []
+  monkeypatch.setattr(sync, "file_hash", lambda path: hashed.append(path) or "changed")
+  reopened = sync.SyncEngine(CountingRemote(remote_root), local_root)
+  assert reopened.local_entry("list.json") == saved["list.json"]
+  assert hashed == []
+  write(local_root / "list.json", "v2", 2000)
+  assert reopened.local_entry("list.json")["hash"] == "changed"
+  assert len(hashed) == 1
+
+
+def test_upload_queue_coalesces_submissions_of_a_path():
+  uploaded = []
+  statuses = []
+  queue = sync.UploadQueue(uploaded.append, debounce=60, on_status=lambda path, status: statuses.append((path, status)))
+  for _ in range(3):
+    queue.submit("list.json")
+  queue.submit("settings.json")
+  assert queue.snapshot() == {"list.json": queue.PENDING, "settings.json": queue.PENDING}
+  # flush skips the debounce delay.
+  assert queue.close(timeout=5)
+  assert sorted(uploaded) == ["list.json", "settings.json"]
+  assert queue.snapshot() == {"list.json": queue.DONE, "settings.json": queue.DONE}
+  assert [status for path, status in statuses if path == "list.json"] == [queue.PENDING] * 3 + [queue.UPLOADING, queue.DONE]
+
+
+def test_upload_queue_reports_failures_and_resubmissions_during_upload():
+  started = threading.Event()
+  release = threading.Event()
+  uploads = []
+
+  def upload(path):
+    uploads.append(path)
+    if path == "broken.json":
+      raise OSError("no connection")
+    if len(uploads) == 1:
+      started.set()
+      release.wait(5)
+
+  queue = sync.UploadQueue(upload, debounce=0)
+  queue.submit("list.json")
+  assert started.wait(5)
+  assert queue.snapshot()["list.json"] == queue.UPLOADING
+  # A change made while the upload runs is uploaded again afterwards, not reported as done.
+  queue.submit("list.json")
+  release.set()
+  queue.submit("broken.json")
+  assert queue.close(timeout=5)
+  assert uploads.count("list.json") == 2
+  assert queue.snapshot() == {"list.json": queue.DONE, "broken.json": queue.FAILED}
@@ -15,9 +15,9 @@ from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
     QFont, QFontDatabase, QGradient, QIcon,
     QImage, QKeySequence, QLinearGradient, QPainter,
     QPalette, QPixmap, QRadialGradient, QTransform)
-from PySide6.QtWidgets import (QAbstractButton, QApplication, QDialog, QDialogButtonBox,
-    QGridLayout, QLabel, QScrollArea, QSizePolicy,
-    QVBoxLayout, QWidget)
+from PySide6.QtWidgets import (QAbstractButton, QAbstractItemView, QApplication, QDialog,
+    QDialogButtonBox, QHeaderView, QLabel, QSizePolicy,
+    QTableView, QWidget)
 
 class Ui_Dialog(object):
     def setupUi(self, Dialog):
@@ -32,21 +32,10 @@ class Ui_Dialog(object):
         self.label = QLabel(Dialog)
         self.label.setObjectName(u"label")
         self.label.setGeometry(QRect(10, 10, 711, 21))
-        self.scrollArea = QScrollArea(Dialog)
-        self.scrollArea.setObjectName(u"scrollArea")
-        self.scrollArea.setGeometry(QRect(10, 40, 711, 421))
-        self.scrollArea.setWidgetResizable(True)
-        self.scrollAreaWidgetContents_2 = QWidget()
-        self.scrollAreaWidgetContents_2.setObjectName(u"scrollAreaWidgetContents_2")
-        self.scrollAreaWidgetContents_2.setGeometry(QRect(0, 0, 709, 419))
-        self.verticalLayout = QVBoxLayout(self.scrollAreaWidgetContents_2)
-        self.verticalLayout.setObjectName(u"verticalLayout")
-        self.words_list = QGridLayout()
-        self.words_list.setObjectName(u"words_list")
-
-        self.verticalLayout.addLayout(self.words_list)
-
-        self.scrollArea.setWidget(self.scrollAreaWidgetContents_2)
+        self.words_table = QTableView(Dialog)
+        self.words_table.setObjectName(u"words_table")
+        self.words_table.setGeometry(QRect(10, 40, 711, 421))
+        self.words_table.setSelectionBehavior(QAbstractItemView.SelectRows)
 
         self.retranslateUi(Dialog)
         self.buttonBox.accepted.connect(Dialog.accept)
@@ -43,6 +43,14 @@ class Ui_MainWindow(object):
         self.settings.setObjectName(u"settings")
         self.network_settings = QAction(MainWindow)
         self.network_settings.setObjectName(u"network_settings")
+        self.show_stats = QAction(MainWindow)
+        self.show_stats.setObjectName(u"show_stats")
+        self.search_words = QAction(MainWindow)
+        self.search_words.setObjectName(u"search_words")
+        self.profile_training = QAction(MainWindow)
+        self.profile_training.setObjectName(u"profile_training")
+        self.latency_report = QAction(MainWindow)
+        self.latency_report.setObjectName(u"latency_report")
         self.centralwidget = QWidget(MainWindow)
         self.centralwidget.setObjectName(u"centralwidget")
         self.horizontalLayoutWidget = QWidget(self.centralwidget)
@@ -82,8 +90,12 @@ class Ui_MainWindow(object):
         self.menu.addAction(self.open_list)
         self.menu.addAction(self.add_word)
         self.menu.addAction(self.change_list)
+        self.menu.addAction(self.show_stats)
+        self.menu.addAction(self.search_words)
         self.menu_2.addAction(self.settings)
         self.menu_2.addAction(self.network_settings)
+        self.menu_2.addAction(self.profile_training)
+        self.menu_2.addAction(self.latency_report)
 
         self.retranslateUi(MainWindow)
 
@@ -101,6 +113,10 @@ class Ui_MainWindow(object):
         self.spelling_train.setText(QCoreApplication.translate("MainWindow", u"\u0422\u0440\u0435\u043d\u0438\u0440\u043e\u0432\u043a\u0430 \u043d\u0430\u043f\u0438\u0441\u0430\u043d\u0438\u044f", None))
         self.settings.setText(QCoreApplication.translate("MainWindow", u"\u0423\u043f\u0440\u0430\u0436\u043d\u0435\u043d\u0438\u044f", None))
         self.network_settings.setText(QCoreApplication.translate("MainWindow", u"\u0421\u0435\u0442\u044c", None))
+        self.show_stats.setText(QCoreApplication.translate("MainWindow", u"\u0421\u0442\u0430\u0442\u0438\u0441\u0442\u0438\u043a\u0430", None))
+        self.search_words.setText(QCoreApplication.translate("MainWindow", u"\u041f\u043e\u0438\u0441\u043a \u043f\u043e \u0441\u043f\u0438\u0441\u043a\u0430\u043c", None))
+        self.profile_training.setText(QCoreApplication.translate("MainWindow", u"\u041f\u0440\u043e\u0444\u0438\u043b\u0438\u0440\u043e\u0432\u0430\u0442\u044c \u0441\u043b\u0435\u0434\u0443\u044e\u0449\u0443\u044e \u0442\u0440\u0435\u043d\u0438\u0440\u043e\u0432\u043a\u0443", None))
+        self.latency_report.setText(QCoreApplication.translate("MainWindow", u"\u0417\u0430\u0434\u0435\u0440\u0436\u043a\u0438 \u0438\u043d\u0442\u0435\u0440\u0444\u0435\u0439\u0441\u0430", None))
         self.menu.setTitle(QCoreApplication.translate("MainWindow", u"\u0414\u0435\u0439\u0441\u0442\u0432\u0438\u044f", None))
         self.menu_2.setTitle(QCoreApplication.translate("MainWindow", u"\u041d\u0430\u0441\u0442\u0440\u043e\u0439\u043a\u0438", None))
     # retranslateUi
@@ -0,0 +1,148 @@
+import collections.abc
+from array import array
+
+
+# Marks records whose script tag has to be (re)computed.
+UNTAGGED = 0xFF
+
+
+class StringTable:
+  __slots__ = ("strings", "ids")
+
+  def __init__(self):
+    self.strings = []
+    self.ids = {}
+
+  def intern(self, string):
+    string_id = self.ids.get(string)
+    if string_id is None:
+      string_id = len(self.strings)
+      self.strings.append(string)
+      self.ids[string] = string_id
+    return string_id
+
+  def __getitem__(self, string_id):
+    return self.strings[string_id]
+
+
+class RecordView(collections.abc.MutableMapping):
+  __slots__ = ("collection", "index")
+
+  KEYS = ("words", "score", "spelling_score")
+
+  def __init__(self, collection, index):
+    self.collection = collection
+    self.index = index
+
+  def __getitem__(self, key):
+    if key == "words":
+      return self.collection.words(self.index)
+    if key == "score":
+      return self.collection.score[self.index]
+    if key == "spelling_score":
+      return self.collection.spelling_score[self.index]
+    raise KeyError(key)
+
+  def __setitem__(self, key, value):
+    if key == "words":
+      self.collection.set_words(self.index, value)
+    elif key == "score":
+      self.collection.score[self.index] = value
+    elif key == "spelling_score":
+      self.collection.spelling_score[self.index] = value
+    else:
+      raise KeyError(key)
+
+  def __delitem__(self, key):
+    raise TypeError("Record fields can not be removed")
+
+  def __iter__(self):
+    return iter(self.KEYS)
+
+  def __len__(self):
+    return len(self.KEYS)
+
+  def __repr__(self):
+    return repr(dict(self))
+
+
+class WordCollection:
+  __slots__ = ("strings", "first", "second", "score", "spelling_score", "tags")
+
+  def __init__(self):
+    self.strings = StringTable()
+    self.first = array("i")
+    self.second = array("i")
+    self.score = array("i")
+    self.spelling_score = array("i")
+    self.tags = bytearray()
+
+  @classmethod
+  def from_records(cls, records):
+    collection = cls()
+    intern = collection.strings.intern
+    collection.first.extend(intern(record["words"][0]) for record in records)
+    collection.second.extend(intern(record["words"][1]) for record in records)
+    collection.score.extend(record["score"] for record in records)
+    collection.spelling_score.extend(record.get("spelling_score", 0) for record in records)
+    collection.tags = bytearray(record.get("tag", UNTAGGED) for record in records)
+    return collection
+
+  def to_records(self):
+    strings = self.strings.strings
+    records = []
+    columns = zip(self.first, self.second, self.score, self.spelling_score, self.tags)
+    for first, second, score, spelling_score, tag in columns:
+      record = {"words": [strings[first], strings[second]], "score": score}
+      if spelling_score:
+        record["spelling_score"] = spelling_score
+      if tag != UNTAGGED:
+        record["tag"] = tag
+      records.append(record)
+    return records
+
+  def __len__(self):
+    return len(self.score)
+
+  def __getitem__(self, idx):
+    if idx < 0:
+      idx += len(self)
+    if not 0 <= idx < len(self):
+      raise IndexError("WordCollection index out of range")
+    return RecordView(self, idx)
+
+  def __iter__(self):
+    return (RecordView(self, idx) for idx in range(len(self)))
+
+  def __delitem__(self, idx):
+    for column in (self.first, self.second, self.score, self.spelling_score, self.tags):
+      del column[idx]
+
+  def extend(self, records):
+    intern = self.strings.intern
+    self.first.extend(intern(record["words"][0]) for record in records)
+    self.second.extend(intern(record["words"][1]) for record in records)
+    self.score.extend(record["score"] for record in records)
+    self.spelling_score.extend(record.get("spelling_score", 0) for record in records)
+    self.tags.extend(record.get("tag", UNTAGGED) for record in records)
+
+  def append(self, record):
+    self.first.append(self.strings.intern(record["words"][0]))
+    self.second.append(self.strings.intern(record["words"][1]))
+    self.score.append(record.get("score", 0))
+    self.spelling_score.append(record.get("spelling_score", 0))
+    self.tags.append(UNTAGGED)
+
+  def words(self, idx):
+    return (self.strings[self.first[idx]], self.strings[self.second[idx]])
+
+  def set_words(self, idx, words):
+    self.first[idx] = self.strings.intern(words[0])
+    self.second[idx] = self.strings.intern(words[1])
+    self.tags[idx] = UNTAGGED
+
+  def untagged(self):
+    idx = self.tags.find(UNTAGGED)
+    while idx != -1:
+      yield idx
+      idx = self.tags.find(UNTAGGED, idx + 1)